@@ -7,7 +7,8 @@ import os
 
 # Import database and models
 import app.models
-from app.database import engine, Base, get_db
+from app.database import engine, Base, SessionLocal, get_db
+from app import migrate
 from app.routers import auth, survey, courses, user, tasks, ai_assistant
 # from app.routers import chat
 import logging
@@ -17,6 +18,11 @@ from app.models.student import Student
 from app.models.course import Course, StudentCourse
 from app.routers.auth import hash_password
 from app.or_tools.main import or_tools_router
+from app.or_tools import jobs as scheduler_jobs
+from app.or_tools.batch import replan_students, resolve_students
+from app.or_tools.optimizer import NIGHT_MODES, SLOT_MINUTES, SOLVER_PRESETS
+from app.or_tools.schemas import BatchReplanRequest
+import asyncio
 
 # Create the FastAPI app instance
 app = FastAPI(title="Student Planner API")
@@ -25,8 +31,13 @@ app = FastAPI(title="Student Planner API")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create tables if they don't exist yet
-Base.metadata.create_all(bind=engine)
+# Bring the schema to the latest migration (backend/migrations). With
+# MIGRATE_ON_STARTUP=0 a release step runs `python -m app.migrate upgrade`
+# and startup only reports what is pending
+if os.getenv("MIGRATE_ON_STARTUP", "1") != "0":
+    migrate.upgrade(engine)
+else:
+    migrate.check(engine)
 
 # CORS middleware
 origins = [
@@ -49,6 +60,9 @@ app.include_router(user.router, prefix="/api")
 app.include_router(or_tools_router, prefix="/api/or-tools")
 app.include_router(ai_assistant.router, prefix="/api")
 
+# Stop the scheduling worker pool with the app
+app.add_event_handler("shutdown", scheduler_jobs.shutdown)
+
 
 # app.include_router(chat.router, prefix="/api")
 
@@ -140,4 +154,39 @@ async def initialize_default_data_endpoint(api_key: str = Security(verify_api_ke
     This endpoint should be called after course data has been synced to the database.
     """
     result = await initialize_default_data(db)
-    return result
\ No newline at end of file
+    return result
+
+def _replan_in_own_session(student_ids, **kwargs):
+    # Runs in a worker thread: a Session is not thread-safe, so the thread
+    # opens its own instead of sharing the request's
+    db = SessionLocal()
+    try:
+        return replan_students(db, student_ids, **kwargs)
+    finally:
+        db.close()
+
+# Re-plan many calendars at once – semester rollover, timetable updates
+@app.post("/api/admin/replan-schedules")
+async def replan_schedules_endpoint(
+    req: BatchReplanRequest,
+    api_key: str = Security(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """
+    Re-optimise the calendars of the given students, of everyone registered in
+    course_id, or of every student. Returns throughput and per-student failures.
+    """
+    if req.slot_minutes not in SLOT_MINUTES:
+        raise HTTPException(status_code=400, detail=f"slot_minutes must be one of {list(SLOT_MINUTES)}")
+    if req.preset not in SOLVER_PRESETS:
+        raise HTTPException(status_code=400, detail=f"preset must be one of {list(SOLVER_PRESETS)}")
+    if req.night_mode not in NIGHT_MODES:
+        raise HTTPException(status_code=400, detail=f"night_mode must be one of {list(NIGHT_MODES)}")
+    student_ids = resolve_students(db, student_ids=req.student_ids, course_id=req.course_id)
+    return await asyncio.to_thread(
+        _replan_in_own_session,
+        student_ids,
+        night_mode=req.night_mode,
+        slot_min=req.slot_minutes,
+        preset=req.preset,
+    )
@@ -0,0 +1,328 @@
+# migrate.py – Versioned schema migrations
+"""The backend owns the database schema; this module moves it forward.
+
+Migrations are the numbered files in ``backend/migrations/`` –
+``NNNN_name.sql`` or ``NNNN_name.py`` (``upgrade(conn)``) – applied in order
+and recorded in ``schema_version`` (one row per version, with the file's
+checksum).  Forward only: undoing a change is a new migration.
+
+A migration runs in one transaction together with its ``schema_version`` row,
+with ``lock_timeout`` set so DDL waiting behind a long query fails instead of
+queueing every request behind it.  Online changes – ``CREATE INDEX
+CONCURRENTLY``, ``DETACH PARTITION … CONCURRENTLY``, attaching a partition in
+short steps – cannot (or should not) hold one transaction: a ``.sql`` file
+starting with ``-- migrate: no-transaction`` (``TRANSACTIONAL = False`` in a
+``.py`` one) runs statement by statement in autocommit and must be safe to
+re-run (``IF NOT EXISTS``).  An index a failed concurrent build left INVALID
+stops the run before the version is recorded.
+
+The models describe the schema at the latest migration: an empty database is
+created by ``Base.metadata.create_all`` and stamped with every migration, a
+database created before migrations existed is stamped ``0`` (baseline) and
+upgraded from there.  Runs are serialised by a PostgreSQL advisory lock, so
+every worker can call :func:`upgrade` on startup.
+
+    python -m app.migrate status | upgrade [--to N] | stamp N | new NAME [--py]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import TIMESTAMP, Column, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+import app.models  # noqa: F401 – registers every table on Base
+from app.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+LOCK_TIMEOUT = os.getenv("MIGRATE_LOCK_TIMEOUT", "5s")  # transactional migrations only
+BASELINE = 0
+_ADVISORY_KEY = 0x706C_616E  # any constant shared by every runner
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+_NO_TRANSACTION = re.compile(r"^--\s*migrate:\s*no-transaction\s*$", re.M)
+_STATEMENT_END = re.compile(r";[ \t]*(?:--[^\n]*)?$", re.M)
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("checksum", String(64)),
+    Column("applied_at", TIMESTAMP, server_default=func.now(), nullable=False),
+)
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    checksum: str
+    transactional: bool
+
+    def run(self, conn: Connection) -> None:
+        if self.path.suffix == ".py":
+            _load_module(self.path).upgrade(conn)
+            return
+        for statement in _split_sql(self.path.read_text()):
+            conn.exec_driver_sql(statement)
+
+
+def _load_module(path: Path):
+    spec = importlib.util.spec_from_file_location(f"migrations.{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _split_sql(text: str) -> List[str]:
+    """Statements of a ``.sql`` migration – one per ``;`` ending a line.
+
+    Dollar‑quoted bodies (functions, ``DO`` blocks) are not split correctly;
+    write those migrations in Python.
+    """
+    if "$$" in text:
+        raise MigrationError("dollar-quoted SQL is not supported in .sql migrations – use a .py migration")
+    statements = []
+    for chunk in _STATEMENT_END.split(text):
+        body = "\n".join(line for line in chunk.splitlines() if not line.lstrip().startswith("--")).strip()
+        if body:
+            statements.append(body)
+    return statements
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(directory.iterdir()):
+        match = _FILENAME.match(path.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version == BASELINE or version in migrations:
+            raise MigrationError(f"{path.name}: version {version:04d} is reserved or already used")
+        raw = path.read_bytes()
+        if path.suffix == ".sql":
+            transactional = not _NO_TRANSACTION.search(raw.decode())
+        else:
+            transactional = getattr(_load_module(path), "TRANSACTIONAL", True)
+        migrations[version] = Migration(
+            version, match.group(2), path, hashlib.sha256(raw).hexdigest(), transactional,
+        )
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def applied_versions(engine: Engine) -> Dict[int, Optional[str]]:
+    """``{version: checksum}`` recorded in ``schema_version`` (empty before the first run)."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return {}
+        return dict(conn.execute(select(schema_version.c.version, schema_version.c.checksum)).all())
+
+
+def current_version(engine: Engine) -> Optional[int]:
+    return max(applied_versions(engine), default=None)
+
+
+@contextmanager
+def _exclusive(engine: Engine) -> Iterator[None]:
+    """Serialise runners across processes (PostgreSQL advisory lock)."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    # Autocommit: an idle open transaction here would make CREATE INDEX
+    # CONCURRENTLY wait for this very connection
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(f"SELECT pg_advisory_lock({_ADVISORY_KEY})")
+        try:
+            yield
+        finally:
+            conn.exec_driver_sql(f"SELECT pg_advisory_unlock({_ADVISORY_KEY})")
+
+
+def _record(conn: Connection, migration: Optional[Migration], name: str = "") -> None:
+    conn.execute(schema_version.insert().values(
+        version=migration.version if migration else BASELINE,
+        name=migration.name if migration else name,
+        checksum=migration.checksum if migration else None,
+    ))
+
+
+def _invalid_indexes(conn: Connection) -> List[str]:
+    return list(conn.exec_driver_sql(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE NOT i.indisvalid AND n.nspname = current_schema()"
+    ).scalars())
+
+
+def _apply(engine: Engine, migration: Migration) -> None:
+    postgres = engine.dialect.name == "postgresql"
+    logger.info("Applying migration %04d_%s", migration.version, migration.name)
+    if migration.transactional:
+        with engine.begin() as conn:
+            if postgres:
+                conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            migration.run(conn)
+            _record(conn, migration)
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        migration.run(conn)
+        if postgres:
+            invalid = _invalid_indexes(conn)
+            if invalid:
+                raise MigrationError(
+                    f"{migration.path.name} left invalid indexes {invalid} – "
+                    "DROP INDEX CONCURRENTLY them and run the migration again"
+                )
+        _record(conn, migration)
+
+
+def _baseline(engine: Engine, migrations: List[Migration]) -> None:
+    """First run on a database: create it at head, or stamp an existing one."""
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        existing = set(inspect(conn).get_table_names()) & set(Base.metadata.tables)
+        if existing:
+            _record(conn, None, "baseline")
+            logger.info("Stamped the existing schema as baseline")
+            return
+        Base.metadata.create_all(conn)
+        _record(conn, None, "create_all")
+        for migration in migrations:
+            _record(conn, migration)
+        logger.info("Created the schema at version %04d", migrations[-1].version if migrations else BASELINE)
+
+
+def upgrade(engine: Engine, target: Optional[int] = None, directory: Path = MIGRATIONS_DIR) -> Optional[int]:
+    """Apply pending migrations up to ``target`` (default: all); returns the new version."""
+    migrations = discover(directory)
+    with _exclusive(engine):
+        if not applied_versions(engine):
+            _baseline(engine, migrations)
+        applied = applied_versions(engine)
+        for migration in migrations:
+            if migration.version not in applied and (target is None or migration.version <= target):
+                _apply(engine, migration)
+    return current_version(engine)
+
+
+def stamp(engine: Engine, target: int, directory: Path = MIGRATIONS_DIR) -> None:
+    """Record migrations up to ``target`` as applied without running them –
+    for changes already made by hand."""
+    migrations = discover(directory)
+    with _exclusive(engine), engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_version.c.version)).scalars())
+        if BASELINE not in applied:
+            _record(conn, None, "baseline")
+        for migration in migrations:
+            if migration.version <= target and migration.version not in applied:
+                _record(conn, migration)
+
+
+def pending(engine: Engine, directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [m for m in discover(directory) if m.version not in applied]
+
+
+def problems(engine: Engine, directory: Path = MIGRATIONS_DIR) -> List[str]:
+    """What stands between the database and the models: pending or edited
+    migrations, and model tables that no migration created."""
+    applied = applied_versions(engine)
+    if not applied:
+        return ["database has no schema_version – run `python -m app.migrate upgrade`"]
+    out = [f"{m.version:04d}_{m.name} is pending" for m in discover(directory) if m.version not in applied]
+    out += [
+        f"{m.version:04d}_{m.name} changed after it was applied"
+        for m in discover(directory)
+        if applied.get(m.version, m.checksum) not in (m.checksum, None)
+    ]
+    with engine.connect() as conn:
+        missing = sorted(set(Base.metadata.tables) - set(inspect(conn).get_table_names()))
+    if missing:
+        out.append(f"tables in the models but not in the database (missing migration?): {', '.join(missing)}")
+    return out
+
+
+def check(engine: Engine, directory: Path = MIGRATIONS_DIR) -> bool:
+    """Log what :func:`problems` finds; True when the schema is current."""
+    found = problems(engine, directory)
+    for problem in found:
+        logger.warning("Schema: %s", problem)
+    return not found
+
+
+def new(name: str, python: bool = False, directory: Path = MIGRATIONS_DIR) -> Path:
+    if not re.fullmatch(r"\w+", name):
+        raise MigrationError("migration names are letters, digits and underscores")
+    version = max((m.version for m in discover(directory)), default=BASELINE) + 1
+    path = directory / f"{version:04d}_{name}.{'py' if python else 'sql'}"
+    if python:
+        path.write_text(
+            f'"""{version:04d} – {name.replace("_", " ")}"""\n\n'
+            "TRANSACTIONAL = True  # False: autocommit, statement by statement (online changes)\n\n\n"
+            "def upgrade(conn):\n    pass\n"
+        )
+    else:
+        path.write_text(
+            f"-- {version:04d} – {name.replace('_', ' ')}\n"
+            "-- (first line `-- migrate: no-transaction` for CONCURRENTLY / partition changes)\n\n"
+        )
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description="Versioned schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="applied and pending migrations")
+    up = commands.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", type=int, dest="target")
+    st = commands.add_parser("stamp", help="mark migrations as applied without running them")
+    st.add_argument("target", type=int)
+    nw = commands.add_parser("new", help="create the next migration file")
+    nw.add_argument("name")
+    nw.add_argument("--py", action="store_true", help="Python migration instead of SQL")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "new":
+        print(new(args.name, args.py))
+        return 0
+
+    if args.command == "upgrade":
+        version = upgrade(engine, args.target)
+        print(f"schema at version {version:04d}")
+    elif args.command == "stamp":
+        stamp(engine, args.target)
+        print(f"stamped up to {args.target:04d}")
+    else:
+        applied = applied_versions(engine)
+        for migration in discover():
+            state = "applied" if migration.version in applied else "pending"
+            mode = "" if migration.transactional else " (no-transaction)"
+            print(f"  {migration.version:04d}  {state:<8} {migration.name}{mode}")
+        found = problems(engine)
+        for problem in found:
+            print(f"! {problem}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
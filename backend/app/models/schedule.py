@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, TIMESTAMP, NUMERIC, Text, Time, ForeignKey, CheckConstraint, Boolean, JSON, ARRAY, DATE, TIME
+from sqlalchemy import Column, String, Integer, TIMESTAMP, NUMERIC, Text, Time, ForeignKey, CheckConstraint, Boolean, JSON, ARRAY, DATE, TIME, Index
 from sqlalchemy.sql import text
 from app.database import Base
 import datetime
@@ -141,6 +141,15 @@ class CalendarEvent(Base):
     __table_args__ = (
         CheckConstraint("event_type IN ('course_lecture', 'study_session', 'fixed_obligation', 'flexible_obligation')"),
         CheckConstraint('priority BETWEEN 1 AND 5'),
+        # Window reads (student + start/end overlap) and per-type reads; existing databases get these
+        # from migrations/0001_calendar_event_indexes.sql
+        Index("ix_calendar_events_student_start", "student_id", "start_time"),
+        Index("ix_calendar_events_student_type", "student_id", "event_type"),
+        # Foreign keys: lookups by obligation / plan and the ON DELETE SET NULL cascades
+        Index("ix_calendar_events_fixed_obligation_id", "fixed_obligation_id"),
+        Index("ix_calendar_events_flexible_obligation_id", "flexible_obligation_id"),
+        Index("ix_calendar_events_study_session_id", "study_session_id"),
+        Index("ix_calendar_events_course_id", "course_id"),
     )
 
 #TODO: we still have not used this table
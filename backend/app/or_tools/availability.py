@@ -0,0 +1,229 @@
+# availability.py – Per‑student occupancy index
+"""Free‑time index: which 15‑minute slots of a student's active window are taken.
+
+Every student with a recent query gets an :class:`OccupancyMap` – one byte per
+slot over :data:`ACTIVE_WINDOW`, ~17 KB for a semester.  A byte holds the number of
+events on the slot rather than a single bit, so deleting one of two
+overlapping events leaves the slot taken.  Queries are slices and regex scans
+over the ``bytearray`` – microseconds, no ``calendar_events`` scan.  It
+answers the ``/tasks/free-time`` and ``/tasks/can-fit`` endpoints.
+
+The index follows ORM writes on its own: session hooks collect the
+``CalendarEvent`` rows each flush adds, moves or deletes and apply them on
+commit (rolled back flushes are dropped), which covers the routers in
+``tasks.py`` / ``courses.py``.  Fixed obligations are expanded from their
+rules (:mod:`.recurrence`); a change to a rule or to one of its exception
+rows drops the student's map instead.  Bulk statements bypass the ORM – the
+optimizer's write‑back and the batch re‑plan call :meth:`invalidate`, and a
+map older than :data:`INDEX_TTL` is rebuilt in case another process wrote.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.schedule import CalendarEvent, FixedObligation
+
+from .recurrence import CANCELLED, load_occurrences
+
+INDEX_SLOT = timedelta(minutes=15)
+ACTIVE_WINDOW = timedelta(days=183)  # as far ahead as recurring events are generated
+INDEX_TTL = timedelta(minutes=10)
+
+Interval = Tuple[datetime, datetime]
+
+
+@lru_cache(maxsize=32)
+def _zero_run(min_slots: int) -> "re.Pattern[bytes]":
+    return re.compile(rb"\x00{%d,}" % max(1, min_slots))
+
+
+# Saturating ±1 on every byte of a slice, in one C call
+_DELTA = {1: bytes(range(1, 256)) + b"\xff", -1: b"\x00" + bytes(range(255))}
+
+
+def _naive(dt: datetime) -> datetime:
+    return dt if dt.tzinfo is None else dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class OccupancyMap:
+    """Event counts per :data:`INDEX_SLOT` over ``[origin, origin + n slots)``."""
+
+    __slots__ = ("origin", "busy", "built_at")
+
+    def __init__(self, origin: datetime, n_slots: int) -> None:
+        self.origin = origin
+        self.busy = bytearray(n_slots)
+        self.built_at = datetime.utcnow()
+
+    # ── maintenance ──────────────────────────────────────────────────────
+    def _slots(self, start: datetime, end: datetime, outer: bool = True) -> Tuple[int, int]:
+        """Slot range of ``[start, end)`` clipped to the map; ``outer``
+        rounds outwards (partly taken slots count as taken)."""
+        a = (_naive(start) - self.origin) / INDEX_SLOT
+        b = (_naive(end) - self.origin) / INDEX_SLOT
+        a, b = (int(a // 1), -int(-b // 1)) if outer else (-int(-a // 1), int(b // 1))
+        return max(0, a), min(len(self.busy), b)
+
+    def add(self, start: datetime, end: datetime, delta: int = 1) -> None:
+        """Count an event on (``delta=1``) or off (``delta=-1``) its slots."""
+        a, b = self._slots(start, end)
+        if a < b:
+            self.busy[a:b] = self.busy[a:b].translate(_DELTA[delta])
+
+    # ── queries ──────────────────────────────────────────────────────────
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        a, b = self._slots(start, end)
+        return self.busy.count(0, a, b) == b - a
+
+    def free_windows(self, start: datetime, end: datetime, min_minutes: int = 0) -> List[Interval]:
+        """Free stretches inside ``[start, end)`` of at least ``min_minutes``."""
+        a, b = self._slots(start, end, outer=False)
+        if a >= b:
+            return []
+        pattern = _zero_run(-(-min_minutes // int(INDEX_SLOT.total_seconds() // 60)))
+        return [self._span(m.start(), m.end()) for m in pattern.finditer(self.busy, a, b)]
+
+    def _span(self, a: int, b: int) -> Interval:
+        return self.origin + a * INDEX_SLOT, self.origin + b * INDEX_SLOT
+
+
+class AvailabilityIndex:
+    """Lazily built, incrementally maintained :class:`OccupancyMap` per student."""
+
+    def __init__(self, window: timedelta = ACTIVE_WINDOW, ttl: timedelta = INDEX_TTL) -> None:
+        self.window = window
+        self.ttl = ttl
+        self._maps: Dict[int, OccupancyMap] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, student_id: int) -> OccupancyMap:
+        origin = self._origin()
+        with self._lock:
+            occ = self._maps.get(student_id)
+        if occ is None or occ.origin != origin or datetime.utcnow() - occ.built_at > self.ttl:
+            occ = self._build(db, student_id, origin)
+            # A map read inside an open write would count its changes twice on commit
+            if not db.info.get(_PENDING):
+                with self._lock:
+                    self._maps[student_id] = occ
+        return occ
+
+    def invalidate(self, student_id: Optional[int] = None) -> None:
+        with self._lock:
+            if student_id is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(student_id, None)
+
+    def apply(self, student_id: int, start: datetime, end: datetime, delta: int) -> None:
+        with self._lock:
+            occ = self._maps.get(student_id)
+            if occ is not None:
+                occ.add(start, end, delta)
+
+    def _origin(self) -> datetime:
+        # From yesterday's midnight, so events that started before today still count
+        return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    def _build(self, db: Session, student_id: int, origin: datetime) -> OccupancyMap:
+        occ = OccupancyMap(origin, int(self.window / INDEX_SLOT))
+        horizon = origin + self.window
+        ce = CalendarEvent
+        rows = db.execute(
+            select(ce.start_time, ce.end_time).where(
+                ce.student_id == student_id, ce.end_time > origin, ce.start_time < horizon,
+                or_(ce.fixed_obligation_id.is_(None), ce.status.is_distinct_from(CANCELLED)),
+            )
+        )
+        for start, end in rows:
+            occ.add(start, end)
+        for o in load_occurrences(db, [student_id], origin, horizon)[student_id]:
+            occ.add(o.start_time, o.end_time)
+        return occ
+
+
+availability_index = AvailabilityIndex()
+
+
+# ── ORM hooks: keep loaded maps in step with committed CalendarEvent rows ──
+
+_PENDING = "availability_changes"
+
+
+_TRACKED = ("student_id", "start_time", "end_time")
+
+
+def _keep_old_value(target, value, oldvalue, initiator) -> None:
+    """Deliberately empty – the listener exists for its registration.
+
+    ``active_history=True`` makes the ORM load the old value of an expired
+    attribute before it is overwritten, so :func:`_collect_changes` can count
+    a moved event off its previous slots.  Registering a ``set`` listener with
+    that flag is SQLAlchemy's way to turn it on from outside the mapping; on
+    the columns themselves it would mean ``column_property`` wrappers in
+    ``models/schedule.py`` for the sake of this index.
+    """
+
+
+for _attr in _TRACKED:
+    event.listen(getattr(CalendarEvent, _attr), "set", _keep_old_value, active_history=True)
+
+
+def _row(obj: CalendarEvent, delta: int, old: bool = False) -> Optional[tuple]:
+    if old:
+        # Values before this flush – ``history`` still holds them in after_flush
+        attrs = inspect(obj).attrs
+        values = tuple(
+            attrs[a].history.deleted[0] if attrs[a].history.deleted else getattr(obj, a) for a in _TRACKED
+        )
+    else:
+        values = tuple(getattr(obj, a) for a in _TRACKED)
+    return (*values, delta) if values[1] and values[2] else None
+
+
+def _rebuilds(obj: Any) -> bool:
+    """A rule or an exception row – its effect on the map is not a plain ±1."""
+    return isinstance(obj, FixedObligation) or (
+        isinstance(obj, CalendarEvent) and obj.fixed_obligation_id is not None
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    # (student, None, …) marks a map to drop
+    rows = [
+        (o.student_id, None, None, 0)
+        for o in chain(session.new, session.deleted, session.dirty) if _rebuilds(o)
+    ]
+    rows += [_row(o, 1) for o in session.new if isinstance(o, CalendarEvent) and not _rebuilds(o)]
+    rows += [_row(o, -1) for o in session.deleted if isinstance(o, CalendarEvent) and not _rebuilds(o)]
+    for obj in session.dirty:
+        if isinstance(obj, CalendarEvent) and not _rebuilds(obj) and any(
+            inspect(obj).attrs[a].history.has_changes() for a in _TRACKED
+        ):
+            rows += [_row(obj, -1, old=True), _row(obj, 1)]
+    rows = [r for r in rows if r is not None]
+    if rows:
+        session.info.setdefault(_PENDING, []).extend(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session) -> None:
+    for student_id, start, end, delta in session.info.pop(_PENDING, ()):
+        if start is None:
+            availability_index.invalidate(student_id)
+        else:
+            availability_index.apply(student_id, start, end, delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session: Session) -> None:
+    session.info.pop(_PENDING, None)
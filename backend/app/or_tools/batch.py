@@ -0,0 +1,221 @@
+# batch.py – Re‑optimise many students at once
+"""Batch re‑planning – semester rollover, timetable changes, back‑fills.
+
+Students are processed in chunks: each chunk is bulk‑loaded with one query
+(:func:`.data.load_solver_inputs`), the CP‑SAT solves fan out over a process
+pool (workers get pure payloads – no DB access), and the write‑back of the
+whole chunk is a bulk UPDATE, an executemany INSERT and one DELETE.  Solver
+output stays in its compact array form until the write‑back streams it out
+:data:`~.optimizer.WRITE_CHUNK` rows at a time, which bounds peak memory on
+large re‑plans.  Per‑student jobs of a chunk's students are held while it
+is loaded, solved and written (:func:`.jobs.hold_students`), so none of them
+commits a diff computed from the calendar the batch replaced.
+
+CLI (from ``backend/``)::
+
+    python -m app.or_tools.batch --all
+    python -m app.or_tools.batch --course 12 --preset fast
+    python -m app.or_tools.batch --students 3 7 9 --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.course import StudentCourse
+from app.models.student import Student
+
+from .availability import availability_index
+from .data import ensure_study_plans, load_solver_inputs
+from .jobs import SCHEDULER_WORKERS, hold_students
+from .optimizer import (
+    SolvedSessions,
+    SolverParams,
+    _diff_sessions,
+    _full_payload,
+    _moved_row,
+    _session_row,
+    _solve_with_or_tools,
+    _split_calendar,
+    _write_session_diff,
+    preference_limits,
+    solver_params,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_CHUNK = int(os.getenv("SCHEDULER_BATCH_CHUNK", "200"))  # students per load/write round
+
+
+def resolve_students(db: Session, *, student_ids: Optional[Sequence[int]] = None, course_id: Optional[int] = None) -> List[int]:
+    """Student ids to re‑plan: the given ids, everyone registered in
+    ``course_id``, or – with neither – every student."""
+    if student_ids is not None:
+        return sorted(set(student_ids))
+    if course_id is not None:
+        stmt = select(StudentCourse.student_id).where(StudentCourse.course_id == course_id).distinct()
+    else:
+        stmt = select(Student.student_id)
+    return sorted(db.scalars(stmt).all())
+
+
+def _solve_student(
+    fixed_payload: List[Dict[str, Any]],
+    flex_payload: List[Dict[str, Any]],
+    night_mode: str,
+    slot_min: int,
+    now: datetime,
+    params: SolverParams,
+    slot_weights: Optional[Dict[str, float]],
+    limits: Dict[str, float],
+) -> SolvedSessions:
+    # Runs in a pool worker
+    sessions, _ = _solve_with_or_tools(
+        fixed_payload, flex_payload,
+        night_mode=night_mode, slot_min=slot_min, now=now, params=params, slot_weights=slot_weights, **limits,
+    )
+    return sessions
+
+
+def _moved_rows(moved: List[Tuple[int, int]], sessions: SolvedSessions) -> Iterable[Dict[str, Any]]:
+    return (_moved_row(eid, sessions[i]) for eid, i in moved)
+
+
+def _session_rows(student_id: int, new: Iterable[int], sessions: SolvedSessions) -> Iterable[Dict[str, Any]]:
+    return (_session_row(student_id, sessions[i]) for i in new)
+
+
+def replan_students(
+    db: Session,
+    student_ids: Sequence[int],
+    *,
+    night_mode: str = "soft",
+    slot_min: int = 30,
+    preset: SolverParams | str = "balanced",
+    workers: int = SCHEDULER_WORKERS,
+    chunk_size: int = BATCH_CHUNK,
+) -> Dict[str, Any]:
+    """Full re‑solve for every student in ``student_ids``.
+
+    A student whose model has no solution keeps their calendar and is listed
+    under ``failed``.  Returns a report with ``students_per_s``.
+    """
+    params = solver_params(preset)
+    # The pool already uses every core – one search worker per process
+    params = SolverParams(1, params.time_limit_s, params.relative_gap)
+    report: Dict[str, Any] = {
+        "students": 0, "sessions": 0, "updated": 0, "inserted": 0, "deleted": 0, "skipped": 0, "failed": {},
+    }
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(student_ids), chunk_size):
+            chunk = list(student_ids[i:i + chunk_size])
+            # Per‑student jobs must not write these calendars under the batch
+            with hold_students(chunk):
+                now = datetime.utcnow()
+
+                # ── Bulk load – one query for the whole chunk (two when new
+                # academic tasks need a study plan first)
+                inputs = load_solver_inputs(db, chunk, now)
+                if any(inputs[sid].missing_plans for sid in chunk):
+                    ensure_study_plans(db, chunk, now)
+                    inputs = load_solver_inputs(db, chunk, now)
+
+                # ── Fan out
+                futures = {}
+                old_flex = {}
+                for sid in chunk:
+                    fixed_events, old_flex[sid], unscheduled, flex_map = _split_calendar(
+                        inputs[sid].events, inputs[sid].obligations, now,
+                    )
+                    fixed_payload, flex_payload = _full_payload(fixed_events, old_flex[sid], unscheduled, flex_map)
+                    if not flex_payload:
+                        report["skipped"] += 1
+                        continue
+                    future = pool.submit(
+                        _solve_student, fixed_payload, flex_payload,
+                        night_mode, slot_min, now, params, inputs[sid].slot_weights,
+                        preference_limits(inputs[sid].preferences),
+                    )
+                    futures[future] = sid
+
+                # ── Collect and stream the chunk back in bulk
+                updates: List[Iterable[Dict[str, Any]]] = []
+                inserts: List[Iterable[Dict[str, Any]]] = []
+                deletes: List[int] = []
+                n_updated = n_inserted = 0
+                for future in as_completed(futures):
+                    sid = futures[future]
+                    try:
+                        sessions = future.result()
+                    except (RuntimeError, ValueError) as exc:
+                        report["failed"][sid] = str(exc)
+                        logger.warning("Batch re‑plan: student %s kept their calendar (%s)", sid, exc)
+                        continue
+                    moved, new, stale = _diff_sessions(old_flex[sid], sessions)
+                    # Row dicts are built lazily while writing, WRITE_CHUNK at a time
+                    updates.append(_moved_rows(moved, sessions))
+                    inserts.append(_session_rows(sid, new, sessions))
+                    deletes += stale
+                    n_updated += len(moved)
+                    n_inserted += len(new)
+                    report["sessions"] += len(sessions)
+                _write_session_diff(db, chain.from_iterable(updates), chain.from_iterable(inserts), deletes)
+                db.commit()
+                for sid in chunk:
+                    availability_index.invalidate(sid)
+            report["students"] += len(chunk)
+            report["updated"] += n_updated
+            report["inserted"] += n_inserted
+            report["deleted"] += len(deletes)
+            logger.info("Batch re‑plan: %d/%d students", report["students"], len(student_ids))
+
+    report["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    report["students_per_s"] = round(report["students"] / report["elapsed_s"], 2) if report["elapsed_s"] else None
+    logger.info(
+        "Batch re‑plan done: %(students)d students (%(skipped)d without tasks) in %(elapsed_s)ss "
+        "– %(students_per_s)s students/s; rows: %(updated)d moved, %(inserted)d inserted, %(deleted)d deleted",
+        report,
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re‑optimise the calendars of many students.")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--students", type=int, nargs="+", help="student ids")
+    who.add_argument("--course", type=int, help="everyone registered in this course_id")
+    who.add_argument("--all", action="store_true", help="every student")
+    parser.add_argument("--preset", default="balanced")
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--night-mode", choices=("soft", "hard"), default="soft")
+    parser.add_argument("--workers", type=int, default=SCHEDULER_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        ids = resolve_students(db, student_ids=args.students, course_id=args.course)
+        report = replan_students(
+            db, ids,
+            night_mode=args.night_mode, slot_min=args.slot_minutes, preset=args.preset, workers=args.workers,
+        )
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
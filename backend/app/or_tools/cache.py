@@ -0,0 +1,141 @@
+# cache.py – Solver result cache
+"""Placement cache for :func:`.optimizer._solve_with_or_tools`.
+
+Many solves repeat an earlier one exactly – an edit that only touched a
+description, a retry after a timeout, the same week asked for twice.  The
+optimizer hashes its canonical input (the per‑session start domains with
+fixed events already cut out, gaps, caps, cost tables and solver params)
+and stores the resulting start slots under that key.  Solution hints are
+left out: they do not change which placements are valid, and a re‑solve of
+an unchanged problem is hinted with the answer it would hit.
+
+Two tiers:
+
+* memory – an LRU of :data:`SCHEDULER_CACHE_SIZE` entries per process;
+* disk – optional (``SCHEDULER_CACHE_DIR``), shared by the job and batch
+  worker processes, entries expire after ``SCHEDULER_CACHE_TTL_S``.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_CACHE_SIZE = int(os.getenv("SCHEDULER_CACHE_SIZE", "256"))  # 0 disables the cache
+SCHEDULER_CACHE_DIR = os.getenv("SCHEDULER_CACHE_DIR") or None
+SCHEDULER_CACHE_TTL_S = float(os.getenv("SCHEDULER_CACHE_TTL_S", "86400"))
+
+
+def canonical_key(*parts: Any) -> str:
+    """Stable digest of plain values (tuples, lists, numbers, strings, frozen dataclasses)."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=20).hexdigest()
+
+
+class SolveCache:
+    """Thread‑safe two‑tier cache of ``key → (start slots, stats)``."""
+
+    def __init__(self, size: int = SCHEDULER_CACHE_SIZE, directory: Optional[str] = SCHEDULER_CACHE_DIR,
+                 ttl_s: float = SCHEDULER_CACHE_TTL_S) -> None:
+        self.size = size
+        self.directory = directory
+        self.ttl_s = ttl_s
+        self._memory: "OrderedDict[str, Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, values: Any, stats: Dict[str, Any]) -> None:
+        entry = (values, stats)
+        with self._lock:
+            self._remember(key, entry)
+        self._write(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._memory),
+                "size": self.size,
+                "disk": self.directory,
+            }
+
+    # ── tiers ────────────────────────────────────────────────────────────
+    def _remember(self, key: str, entry: Tuple[Any, Dict[str, Any]]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _read(self, key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_s:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logger.warning("Solve cache: unreadable entry %s (%s)", key, exc)
+            return None
+
+    def _write(self, key: str, entry: Tuple[Any, Dict[str, Any]]) -> None:
+        if not self.directory:
+            return
+        try:
+            # Write‑then‑rename so concurrent readers never see half a file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except OSError as exc:
+            logger.warning("Solve cache: could not write %s (%s)", key, exc)
+
+
+# Process‑wide instance used by the optimizer
+solve_cache = SolveCache()
@@ -0,0 +1,244 @@
+# data.py – Solver input loading
+"""Data access for the scheduler – everything a solve reads, in two queries.
+
+Only the future matters to a re‑solve, so events are loaded from ``now`` on
+(running ones included) and only the columns the optimizer touches are
+selected.  Events, flexible obligations, academic study plans, the
+productivity profile and the student's stored preferences come back from a
+single ``UNION ALL`` as plain tuples; the named tuples below keep the ORM
+attribute names so the optimizer helpers accept either.  Recurring fixed obligations are not stored as events; the
+second query expands their rules (:mod:`.recurrence`) up to the furthest
+obligation deadline.
+
+Academic tasks are scheduled through their per‑student study plan
+(``study_sessions``): :func:`ensure_study_plans` creates the missing plans for
+every open task of the student's courses in one ``INSERT … SELECT``, and a
+plan without an ``estimated_hours`` prediction gets :data:`TASK_TYPE_HOURS`.
+The load flags students with such a task (``missing_plans``), so the insert
+only runs – followed by a second load – when a task is new.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import (
+    JSON, NUMERIC, TIMESTAMP, Boolean, Integer, String, case, cast, exists, insert, literal, null, or_, select,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from app.models.academic import AcademicTask
+from app.models.behavior import ProductivityProfile
+from app.models.course import StudentCourse
+from app.models.schedule import CalendarEvent, FlexibleObligation, PersonalizedStudySession
+from app.models.student import Student
+
+from .recurrence import CANCELLED, EXPANSION_HORIZON, load_occurrences
+
+# Event types the optimizer reads (fixed blocks and movable sessions)
+SOLVER_EVENT_TYPES = ("fixed_obligation", "flexible_obligation", "study_session")
+
+# Effort (hours) and priority of an academic task until the plan has a prediction
+TASK_TYPE_HOURS = {"revision": 2, "assignment": 4, "project": 8, "exam": 6}
+TASK_TYPE_PRIORITY = {"revision": 2, "assignment": 3, "project": 3, "exam": 4}
+STUDY_CHUNK_HOURS = 1
+
+
+class StudyKey(NamedTuple):
+    """Task key of an academic study plan; flexible obligations are keyed by
+    their plain ``obligation_id``."""
+    session_id: int
+
+
+class EventRow(NamedTuple):
+    event_id: Optional[int]  # None for an occurrence expanded from a fixed obligation's rule
+    event_type: str
+    flexible_obligation_id: Optional[int]
+    start_time: datetime
+    end_time: datetime
+    study_session_id: Optional[int] = None
+
+    @property
+    def task_key(self) -> Any:
+        if self.event_type == "study_session":
+            return StudyKey(self.study_session_id) if self.study_session_id else None
+        return self.flexible_obligation_id
+
+
+class ObligationRow(NamedTuple):
+    obligation_id: int
+    weekly_target_hours: Decimal  # total hours to place
+    constraints: Optional[Dict[str, Any]]
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+    priority: Optional[int]
+    scheduled: bool  # has session rows (past or future) – not new
+    study: bool = False  # an academic study plan (``obligation_id`` is its session_id)
+
+    @property
+    def task_key(self) -> Any:
+        return StudyKey(self.obligation_id) if self.study else self.obligation_id
+
+
+@dataclass
+class SolverInputs:
+    events: List[EventRow] = field(default_factory=list)
+    obligations: List[ObligationRow] = field(default_factory=list)
+    slot_weights: Optional[Dict[str, float]] = None
+    preferences: Optional[Dict[str, Any]] = None  # ``students.preferences``
+    missing_plans: bool = False  # an open academic task has no study plan yet
+
+
+def _tasks_without_plan(columns: Iterable[Any], student_ids: List[int], now: datetime):
+    """``SELECT columns`` over the open academic tasks of the students'
+    courses (``StudentCourse`` joined with ``AcademicTask``) that have no
+    study plan for the student yet."""
+    sc, t, ps = StudentCourse, AcademicTask, PersonalizedStudySession
+    return (
+        select(*columns)
+        .select_from(sc)
+        .join(t, t.course_id == sc.course_id)
+        .where(
+            sc.student_id.in_(student_ids),
+            t.status != "completed",
+            t.deadline > now,
+            ~exists().where(ps.student_id == sc.student_id, ps.task_id == t.task_id),
+        )
+    )
+
+
+def ensure_study_plans(db: Session, student_ids: Iterable[int], now: datetime) -> None:
+    """Give every open academic task of the students' courses a study plan
+    (one ``INSERT … SELECT``).  Priority comes from the task type; effort is
+    left to the prediction (``estimated_hours``) or :data:`TASK_TYPE_HOURS`.
+
+    New plans are committed right away: they are the student's data, not
+    part of the solve that follows, and must survive it failing or being
+    cancelled."""
+    sc, t = StudentCourse, AcademicTask
+    missing = _tasks_without_plan(
+        [
+            sc.student_id, t.task_id, t.course_id, t.title,
+            case(TASK_TYPE_PRIORITY, value=t.task_type, else_=3), literal(now, TIMESTAMP), t.deadline,
+        ],
+        list(student_ids), now,
+    ).distinct()
+    created = db.execute(insert(PersonalizedStudySession).from_select(
+        ["student_id", "task_id", "course_id", "description", "priority", "start_date", "end_date"], missing,
+    ))
+    if created.rowcount:
+        db.commit()
+
+
+def started_hours(db: Session, student_id: int, obligation_ids: Iterable[int], now: datetime) -> Dict[int, float]:
+    """Hours of the obligations' sessions that started before ``now`` (done or
+    running) – :func:`load_solver_inputs` does not read past events, but a
+    re‑plan from the obligation's row must not place these hours again."""
+    ce = CalendarEvent
+    done: Dict[int, float] = {}
+    for oid, start, end in db.execute(
+        select(ce.flexible_obligation_id, ce.start_time, ce.end_time).where(
+            ce.student_id == student_id,
+            ce.event_type == "flexible_obligation",
+            ce.flexible_obligation_id.in_(list(obligation_ids)),
+            ce.start_time < now,
+        )
+    ):
+        done[oid] = done.get(oid, 0.0) + (end - start).total_seconds() / 3600
+    return done
+
+
+def load_solver_inputs(db: Session, student_ids: Iterable[int], now: datetime) -> Dict[int, SolverInputs]:
+    """Events ending after ``now``, flexible obligations, study plans of open
+    academic tasks, slot weights, preferences and whether a plan is missing
+    for every student in ``student_ids`` – one round trip – then the
+    occurrences of their fixed obligations."""
+    student_ids = list(student_ids)
+    ce, fo, pp = CalendarEvent, FlexibleObligation, ProductivityProfile
+    ps, t, sc, st = PersonalizedStudySession, AcademicTask, StudentCourse, Student
+    # Columns: kind, student, id, obligation ref, study plan ref, event / task type, start, end,
+    #          target hours, session hours, priority, json (constraints / slot weights), scheduled
+    events = select(
+        literal("e", String), ce.student_id, ce.event_id, ce.flexible_obligation_id, ce.study_session_id,
+        ce.event_type, ce.start_time, ce.end_time,
+        cast(null(), NUMERIC), cast(null(), NUMERIC), cast(null(), Integer), cast(null(), JSON), cast(null(), Boolean),
+    ).where(
+        ce.student_id.in_(student_ids),
+        ce.end_time > now,
+        ce.event_type.in_(SOLVER_EVENT_TYPES),
+        # A cancelled occurrence of a fixed obligation blocks nothing
+        or_(ce.fixed_obligation_id.is_(None), ce.status.is_distinct_from(CANCELLED)),
+    )
+    obligations = select(
+        literal("o", String), fo.student_id, fo.obligation_id, cast(null(), Integer), cast(null(), Integer),
+        cast(null(), String), fo.start_date, fo.end_date,
+        fo.weekly_target_hours, cast(null(), NUMERIC), fo.priority, fo.constraints,
+        exists().where(ce.flexible_obligation_id == fo.obligation_id),
+    ).where(fo.student_id.in_(student_ids))
+    # Study plans of open tasks in courses the student is still registered in
+    plans = select(
+        literal("s", String), ps.student_id, ps.session_id, cast(null(), Integer), cast(null(), Integer),
+        t.task_type, ps.start_date, t.deadline,
+        ps.estimated_hours, ps.preferred_chunk_size, ps.priority, cast(null(), JSON),
+        exists().where(ce.study_session_id == ps.session_id),
+    ).join(t, t.task_id == ps.task_id).where(
+        ps.student_id.in_(student_ids),
+        t.status != "completed",
+        t.deadline > now,
+        exists().where(sc.student_id == ps.student_id, sc.course_id == t.course_id),
+    )
+    profiles = select(
+        literal("p", String), pp.student_id, pp.profile_id, cast(null(), Integer), cast(null(), Integer),
+        cast(null(), String), cast(null(), TIMESTAMP), cast(null(), TIMESTAMP),
+        cast(null(), NUMERIC), cast(null(), NUMERIC), cast(null(), Integer), pp.slot_weights, cast(null(), Boolean),
+    ).where(pp.student_id.in_(student_ids))
+    students = select(
+        literal("u", String), st.student_id, st.student_id, cast(null(), Integer), cast(null(), Integer),
+        cast(null(), String), cast(null(), TIMESTAMP), cast(null(), TIMESTAMP),
+        cast(null(), NUMERIC), cast(null(), NUMERIC), cast(null(), Integer), st.preferences, cast(null(), Boolean),
+    ).where(st.student_id.in_(student_ids))
+    # One row per open task still without a plan – only its student is read
+    unplanned = _tasks_without_plan(
+        [
+            literal("m", String), sc.student_id, t.task_id, cast(null(), Integer), cast(null(), Integer),
+            cast(null(), String), cast(null(), TIMESTAMP), cast(null(), TIMESTAMP),
+            cast(null(), NUMERIC), cast(null(), NUMERIC), cast(null(), Integer), cast(null(), JSON), cast(null(), Boolean),
+        ],
+        student_ids, now,
+    )
+
+    out = {sid: SolverInputs() for sid in student_ids}
+    for kind, sid, row_id, ref, study_ref, etype, start, end, hours, chunk, priority, payload, scheduled in db.execute(
+        union_all(events, obligations, plans, profiles, students, unplanned)
+    ):
+        inputs = out[sid]
+        if kind == "e":
+            inputs.events.append(EventRow(row_id, etype, ref, start, end, study_ref))
+        elif kind == "o":
+            inputs.obligations.append(ObligationRow(row_id, hours, payload, start, end, priority, bool(scheduled)))
+        elif kind == "s":
+            inputs.obligations.append(ObligationRow(
+                row_id,
+                hours if hours is not None else Decimal(TASK_TYPE_HOURS.get(etype, STUDY_CHUNK_HOURS)),
+                {"session_hours": float(chunk or STUDY_CHUNK_HOURS)},
+                start, end,
+                priority,
+                bool(scheduled),
+                study=True,
+            ))
+        elif kind == "p":
+            inputs.slot_weights = payload
+        elif kind == "u":
+            inputs.preferences = payload
+        else:
+            inputs.missing_plans = True
+
+    horizon = max(
+        [now + EXPANSION_HORIZON] + [o.end_date for i in out.values() for o in i.obligations if o.end_date]
+    )
+    for sid, occurrences in load_occurrences(db, student_ids, now, horizon).items():
+        out[sid].events += [EventRow(None, "fixed_obligation", None, o.start_time, o.end_time) for o in occurrences]
+    return out
@@ -0,0 +1,328 @@
+# jobs.py – Background re‑optimisation jobs
+"""Scheduling job queue – keeps CP‑SAT solves off the request path.
+
+Writes call :func:`enqueue_reschedule` and return immediately; the solve runs
+in a process pool (CP‑SAT holds the CPU, so threads would still starve the
+event loop's worker).  Edits are debounced per student: a burst is folded
+into one job that starts once the burst settles, and a solve still running
+from before the burst is cancelled rather than allowed to write stale data.
+A batch re‑plan (:mod:`.batch`) holds its students' jobs while it rewrites
+their calendars (:func:`hold_students`).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from app.database import SessionLocal, engine
+
+from .availability import availability_index
+from .optimizer import SOLVER_PRESETS, SolveCancelled, update_schedule
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+# Quiet period after the last edit before a student's solve starts
+SCHEDULER_DEBOUNCE_S = float(os.getenv("SCHEDULER_DEBOUNCE_S", "1.5"))
+_PRESET_ORDER = list(SOLVER_PRESETS)  # fastest first
+JOB_TTL = timedelta(hours=1)  # finished jobs stay queryable this long
+
+
+@dataclass
+class ScheduleJob:
+    job_id: str
+    student_id: int
+    # None → full re‑solve, otherwise the obligations changed since the last solve
+    changed_obligation_ids: Optional[Set[int]]
+    slot_min: int = 30
+    night_mode: str = "soft"
+    preset: str = "balanced"  # key of SOLVER_PRESETS
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    coalesced: int = 1      # number of requests folded into this job
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel: Any = field(default=None, repr=False)  # manager Event while running
+    superseded_by: Optional[str] = None  # job that took over a cancelled one's edits
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "student_id": self.student_id,
+            "status": self.status,
+            "coalesced": self.coalesced,
+            "preset": self.preset,
+            "superseded_by": self.superseded_by,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# Worker side (runs in the pool processes)
+# ════════════════════════════════════════════════════════════════════════════
+
+def _init_worker() -> None:
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+
+def _run_job(
+    student_id: int,
+    changed_obligation_ids: Optional[List[int]],
+    slot_min: int,
+    night_mode: str,
+    preset: str,
+    cancel: Any,
+) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        sessions = update_schedule(
+            db,
+            student_id=student_id,
+            changed_obligation_ids=changed_obligation_ids,
+            night_mode=night_mode,
+            slot_min=slot_min,
+            cancel=cancel,
+            params=preset,
+        )
+    finally:
+        db.close()
+    return {
+        "sessions": len(sessions),
+        "night_sessions": [
+            {"flexible_obligation_id": s["flexible_obligation_id"], "start": s["start"], "end": s["end"]}
+            for s in sessions
+            if s.get("night")
+        ],
+    }
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# Queue (API process)
+# ════════════════════════════════════════════════════════════════════════════
+
+_lock = threading.RLock()  # done‑callbacks may fire inside _submit
+_pool: Optional[ProcessPoolExecutor] = None
+_manager: Optional[SyncManager] = None  # hands out cancel events workers can see
+_jobs: Dict[str, ScheduleJob] = {}
+_running: Dict[int, ScheduleJob] = {}  # student_id → job in the pool
+_queued: Dict[int, ScheduleJob] = {}   # student_id → job collecting the current burst
+_timers: Dict[int, threading.Timer] = {}  # student_id → pending debounce timer
+_held: Counter = Counter()  # student_id → batch re‑plans writing their calendar
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _manager
+    if _pool is None:
+        _manager = multiprocessing.Manager()
+        _pool = ProcessPoolExecutor(max_workers=SCHEDULER_WORKERS, initializer=_init_worker)
+    return _pool
+
+
+def enqueue_reschedule(
+    student_id: int,
+    *,
+    changed_obligation_ids: Optional[Iterable[int]] = None,
+    slot_min: int = 30,
+    night_mode: str = "soft",
+    preset: str = "balanced",
+    debounce_s: float = SCHEDULER_DEBOUNCE_S,
+) -> ScheduleJob:
+    """Queue a re‑optimisation for ``student_id`` and return its job.
+
+    Edits are collected for ``debounce_s`` after the *last* one: every call
+    within the window is merged into the same job (union of changed
+    obligations, latest solver options) and restarts the timer, so a burst
+    costs one solve.  When the window closes while an older solve is still
+    running, that solve is cancelled – its result would be stale anyway.
+
+    ``preset`` picks the solver budget; a merged job keeps the fastest one
+    asked for, so an interactive caller is never stuck behind a background
+    budget.
+    """
+    changed = None if changed_obligation_ids is None else set(changed_obligation_ids)
+    with _lock:
+        _prune()
+        job = _queued.get(student_id)
+        if job is not None:
+            _merge(job, changed)
+            job.slot_min, job.night_mode = slot_min, night_mode
+            job.preset = min(job.preset, preset, key=_PRESET_ORDER.index)
+            job.coalesced += 1
+        else:
+            job = ScheduleJob(uuid.uuid4().hex, student_id, changed, slot_min, night_mode, preset)
+            _jobs[job.job_id] = job
+            _queued[student_id] = job
+
+        timer = _timers.pop(student_id, None)
+        if timer is not None:
+            timer.cancel()
+        if debounce_s <= 0:
+            _dispatch(student_id)
+        else:
+            timer = threading.Timer(debounce_s, _dispatch, args=(student_id,))
+            timer.daemon = True
+            _timers[student_id] = timer
+            timer.start()
+        return job
+
+
+def get_job(job_id: str) -> Optional[ScheduleJob]:
+    return _jobs.get(job_id)
+
+
+async def wait_for_job(job: ScheduleJob, timeout_s: float) -> ScheduleJob:
+    """Wait (without blocking the event loop) until ``job`` – or the job that
+    superseded it – finishes, or ``timeout_s`` runs out; returns the last job
+    followed.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_s
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await asyncio.to_thread(job.done.wait, remaining):
+            return job
+        nxt = _jobs.get(job.superseded_by) if job.superseded_by else None
+        if nxt is None:
+            return job
+        job = nxt
+
+
+@contextmanager
+def hold_students(student_ids: Iterable[int]) -> Iterator[None]:
+    """Keep the students' jobs off the pool while a batch re‑plan solves and
+    writes their calendars.
+
+    A running solve is cancelled (or, past its search, allowed to finish its
+    write) and waited for, so the batch loads a calendar no job is about to
+    overwrite.  Jobs queued meanwhile wait and start on release – their edits
+    may have landed after the batch loaded.  Only this process's queue is
+    held: run the batch through the API (``POST /api/admin/replan-schedules``)
+    while it serves writes.
+    """
+    ids = set(student_ids)
+    with _lock:
+        _held.update(ids)
+        running = [_running[sid] for sid in ids if sid in _running]
+        for job in running:
+            if job.cancel is not None:
+                job.cancel.set()
+    for job in running:
+        job.done.wait()
+    try:
+        yield
+    finally:
+        with _lock:
+            _held.subtract(ids)
+            for sid in ids:
+                if _held[sid] <= 0:
+                    del _held[sid]
+                    if sid in _queued and sid not in _timers:
+                        _submit(_queued.pop(sid))
+
+
+def _merge(job: ScheduleJob, changed: Optional[Set[int]]) -> None:
+    if job.changed_obligation_ids is None or changed is None:
+        job.changed_obligation_ids = None
+    else:
+        job.changed_obligation_ids |= changed
+
+
+def _dispatch(student_id: int) -> None:
+    """Debounce window closed – start the queued job or supersede the running one."""
+    with _lock:
+        _timers.pop(student_id, None)
+        if student_id not in _queued or student_id in _held:
+            return  # a held student's job starts on release
+        running = _running.get(student_id)
+        if running is not None:
+            # _finished() dispatches the queued job once the worker lets go
+            if running.cancel is not None:
+                running.cancel.set()
+            return
+        _submit(_queued.pop(student_id))
+
+
+def _submit(job: ScheduleJob) -> None:
+    """Hand ``job`` to the pool – caller holds ``_lock``."""
+    job.status, job.started_at = "running", datetime.utcnow()
+    _running[job.student_id] = job
+    changed = None if job.changed_obligation_ids is None else sorted(job.changed_obligation_ids)
+    try:
+        pool = _get_pool()
+        job.cancel = _manager.Event()
+        future = pool.submit(
+            _run_job, job.student_id, changed, job.slot_min, job.night_mode, job.preset, job.cancel,
+        )
+    except RuntimeError as exc:  # pool shut down or broken
+        job.status, job.error, job.finished_at = "failed", str(exc), datetime.utcnow()
+        _running.pop(job.student_id, None)
+        job.done.set()
+        logger.error("Could not dispatch schedule job %s: %s", job.job_id, exc)
+        return
+    future.add_done_callback(lambda f, job=job: _finished(job, f))
+
+
+def _finished(job: ScheduleJob, future: Future) -> None:
+    with _lock:
+        job.finished_at = datetime.utcnow()
+        job.cancel = None
+        exc = future.exception()
+        if exc is None:
+            job.status, job.result = "done", future.result()
+            # The worker wrote with bulk statements – rebuild this student's free‑time map
+            availability_index.invalidate(job.student_id)
+        elif isinstance(exc, SolveCancelled):
+            # Nothing was written – the superseding job must cover these edits too
+            job.status = "cancelled"
+            nxt = _queued.get(job.student_id)
+            if nxt is not None:
+                _merge(nxt, job.changed_obligation_ids)
+                nxt.preset = min(nxt.preset, job.preset, key=_PRESET_ORDER.index)
+                job.superseded_by = nxt.job_id
+            logger.info("Schedule job %s for student %s superseded", job.job_id, job.student_id)
+        else:
+            job.status, job.error = "failed", str(exc)
+            logger.error("Schedule job %s for student %s failed: %s", job.job_id, job.student_id, exc)
+        _running.pop(job.student_id, None)
+        job.done.set()
+        # Still inside a debounce window → its timer will dispatch; held → on release
+        if job.student_id in _queued and job.student_id not in _timers and job.student_id not in _held:
+            _submit(_queued.pop(job.student_id))
+
+
+def _prune() -> None:
+    cutoff = datetime.utcnow() - JOB_TTL
+    for job_id in [j.job_id for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+def shutdown() -> None:
+    """Stop the worker pool (app shutdown); running solves are abandoned."""
+    global _pool, _manager
+    with _lock:
+        for timer in _timers.values():
+            timer.cancel()
+        _timers.clear()
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _manager.shutdown()
+            _pool = _manager = None
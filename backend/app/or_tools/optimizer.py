@@ -7,83 +7,389 @@ Fixes
    We re‑query their `FlexibleObligation` rows so reclaimed tasks keep their
    original time window.
 2. **No overlap between any sessions (flex‑vs‑flex)**
-   Replaced pairwise hack with proper **`AddNoOverlap`** using interval vars and
-   fixed intervals for the already‑blocked fixed events.
+   Time‑indexed model: one boolean per (session class, allowed start slot)
+   and ``AddAtMostOne`` over the starts covering each slot; fixed events are
+   cut out of the start domains.
+3. **Incremental re‑solve**
+   Edits only free the sessions they touch (plus clashes); everything else is
+   frozen, with a full re‑solve as fallback.
 """
 from __future__ import annotations
 
 import logging
+import os
+from array import array
+from itertools import islice
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional, Set
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
+from sqlalchemy import delete, insert, update
 from ortools.sat.python import cp_model
 
-from app.models.schedule import CalendarEvent, FlexibleObligation
+from app.models.schedule import CalendarEvent
+
+from .availability import availability_index
+from .cache import SolveCache, canonical_key, solve_cache
+from .data import EventRow, ObligationRow, StudyKey, ensure_study_plans, load_solver_inputs, started_hours
 
 logger = logging.getLogger(__name__)
 
+# Sessions starting 23:00‑08:00 are disfavoured ("soft") or forbidden ("hard")
+DAY_START_HOUR = 8
+NIGHT_START_HOUR = 23
+NIGHT_MODES = ("soft", "hard")
+
+# Scheduler grid resolution (minutes) and the window given to open‑ended tasks
+SLOT_MINUTES = (15, 30, 60)
+OPEN_TASK_WINDOW = timedelta(days=7)
+CANCEL_POLL_S = 0.05
+# Objective weights (per session, all in integer cost units):
+#   earliness   priority (1‑5) per slot after the window opens
+#   deadline    per slot a session ends inside the last DEADLINE_BUFFER of its window
+#   time of day EFFICIENCY_SCALE × (1 − slot weight) from the productivity profile
+# Night slots (soft mode) cost more than all of these together can save.
+DEADLINE_BUFFER = timedelta(days=1)
+DEADLINE_WEIGHT = 10
+EFFICIENCY_SCALE = 100
+DEFAULT_SLOT_WEIGHT = 0.5  # the behaviour analyzer's value for unseen slots
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Opt‑in decomposition block length: sessions are pinned to one week of their
+# window by a heuristic, which trades objective for speed
+BLOCK_DAYS = 7
+MIN_BLOCK_TIME_S = 1.0  # floor for a block's share of the time limit
+# Rows per executemany round when writing sessions back
+WRITE_CHUNK = 1000
+
+
+@dataclass(frozen=True)
+class SolverParams:
+    """CP‑SAT search settings for one solve.
+
+    ``num_workers`` 0 lets CP‑SAT use every core; ``relative_gap`` stops the
+    search once the incumbent is provably within that fraction of optimal.
+    """
+    num_workers: int = 8
+    time_limit_s: float = 10.0
+    relative_gap: float = 0.01
+
+    def apply(self, solver: cp_model.CpSolver) -> None:
+        solver.parameters.num_workers = self.num_workers
+        solver.parameters.max_time_in_seconds = self.time_limit_s
+        solver.parameters.relative_gap_limit = self.relative_gap
+
+
+# "fast" for callers waiting on the answer, "balanced" for background jobs,
+# "optimal" for offline re‑plans
+SOLVER_PRESETS: Dict[str, SolverParams] = {
+    "fast": SolverParams(num_workers=4, time_limit_s=2.0, relative_gap=0.05),
+    "balanced": SolverParams(num_workers=8, time_limit_s=10.0, relative_gap=0.01),
+    "optimal": SolverParams(num_workers=0, time_limit_s=60.0, relative_gap=0.0),
+}
+
+
+def solver_params(params: SolverParams | str) -> SolverParams:
+    """Resolve a preset name (or pass through an explicit :class:`SolverParams`)."""
+    if isinstance(params, SolverParams):
+        return params
+    try:
+        return SOLVER_PRESETS[params]
+    except KeyError:
+        raise ValueError(f"Unknown solver preset {params!r}; expected one of {list(SOLVER_PRESETS)}") from None
+
+
+class SolveCancelled(Exception):
+    """The solve was stopped because newer input superseded it."""
+
+
+class SolvedSessions:
+    """Solver output as parallel arrays – start slot, duration, task index.
+
+    A session costs ~10 bytes here instead of a dict with four datetimes, and
+    the arrays pickle compactly across the batch process pool.  Datetimes are
+    only built on access: ``sessions[i]`` (and iteration) yields the session
+    dict (``flexible_obligation_id``, ``priority``, ``date``, ``start``,
+    ``end``, ``night``), one at a time.
+    """
+
+    def __init__(
+        self,
+        origin: datetime = datetime.min,
+        slot_min: int = 30,
+        day_slots: Tuple[int, int] = (0, 0),
+    ) -> None:
+        self.origin = origin      # datetime of slot 0
+        self.slot_min = slot_min
+        self.day_slots = day_slots  # first / last daytime start slot of a day
+        self.start = array("l")
+        self.dur = array("H")
+        self.task = array("H")
+        self.tasks: List[Tuple[Any, int]] = []  # (task key, priority) by task index
+
+    def add_task(self, key: Any, priority: int) -> int:
+        self.tasks.append((key, priority))
+        return len(self.tasks) - 1
+
+    def append(self, start: int, dur: int, task: int) -> None:
+        self.start.append(start)
+        self.dur.append(dur)
+        self.task.append(task)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def task_key(self, i: int) -> Any:
+        return self.tasks[self.task[i]][0]
+
+    def start_time(self, i: int) -> datetime:
+        return self.origin + timedelta(minutes=self.start[i] * self.slot_min)
+
+    def end_time(self, i: int) -> datetime:
+        return self.origin + timedelta(minutes=(self.start[i] + self.dur[i]) * self.slot_min)
+
+    def is_night(self, i: int) -> bool:
+        lo, hi = self.day_slots
+        return not lo <= self.start[i] % (24 * 60 // self.slot_min) <= hi
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        start = self.start_time(i)
+        key, priority = self.tasks[self.task[i]]
+        return {
+            "flexible_obligation_id": key,  # the task key
+            "priority": priority,
+            "date": start.replace(hour=0, minute=0, second=0, microsecond=0),
+            "start": start,
+            "end": self.end_time(i),
+            "night": self.is_night(i),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(len(self)))
+
 # ════════════════════════════════════════════════════════════════════════════
 # Public API
 # ════════════════════════════════════════════════════════════════════════════
 
-def update_schedule(db: Session, *, student_id: int) -> None:
-    """Re‑optimise a student’s calendar after any change."""
-    logger.info("Re‑scheduling calendar for student %s", student_id)
+def update_schedule(
+    db: Session,
+    *,
+    student_id: int,
+    changed_obligation_ids: Optional[Iterable[int]] = None,
+    night_mode: str = "soft",
+    slot_min: int = 30,
+    cancel: Optional[Any] = None,
+    params: SolverParams | str = "balanced",
+) -> SolvedSessions:
+    """Re‑optimise a student’s calendar after any change.
 
-    events = db.scalars(select(CalendarEvent).where(CalendarEvent.student_id == student_id)).all()
-    fixed_events, old_flex_events = _partition_events(events)
+    Only the future is re‑planned: sessions that already started stay where
+    they are (running ones block their slot) and past events never reach the
+    model.  ``slot_min`` sets the grid resolution (15/30/60 minutes).
 
-    # ── Unscheduled obligations (new)
-    scheduled_ids = {e.flexible_obligation_id for e in old_flex_events if e.flexible_obligation_id}
-    unscheduled = db.scalars(
-        select(FlexibleObligation)
-        .where(
-            FlexibleObligation.student_id == student_id,
-            FlexibleObligation.obligation_id.not_in(scheduled_ids),
-        )
-    ).all()
+    ``params`` is a :data:`SOLVER_PRESETS` name or explicit
+    :class:`SolverParams`.  ``cancel`` is an ``Event``‑like object; once it is set the running solve
+    is stopped and :class:`SolveCancelled` raised before anything is written.
+    The student's productivity profile (``slot_weights``), if any, steers
+    sessions towards their efficient hours, and the daily cap / session gap
+    stored in their preferences apply (:func:`preference_limits`).  Open academic tasks of the
+    student's courses are planned in the same model as ``study_session``
+    events, each before its deadline (see :func:`.data.ensure_study_plans`).
 
-    # ── Map of all flex obligation rows we’ll need (for windows/session hrs)
-    needed_ids = scheduled_ids.union(o.obligation_id for o in unscheduled)
-    flex_rows_map = {row.obligation_id: row for row in db.scalars(
-        select(FlexibleObligation).where(FlexibleObligation.obligation_id.in_(needed_ids))
-    ).all()}
+    Returns the sessions placed by this solve as :class:`SolvedSessions`.
 
-    fixed_payload = [_ce_to_dict(e) for e in fixed_events]
-    prev_tasks   = _regroup_old_flex(old_flex_events, flex_rows_map)
-    new_tasks    = [_flex_to_task(o) for o in unscheduled]
-    flex_payload = prev_tasks + new_tasks
+    ``changed_obligation_ids`` switches to an *incremental* re‑solve: only the
+    sessions of those flexible obligations, brand‑new obligations and sessions
+    that now clash with something become decision variables – every other
+    placed session is frozen as a fixed interval.  Pass an empty list after a
+    fixed‑obligation edit.  ``None`` (or an infeasible incremental model)
+    rebuilds the whole horizon.
+    """
+    logger.info("Re‑scheduling calendar for student %s", student_id)
+
+    now = datetime.utcnow()
+    inputs = load_solver_inputs(db, [student_id], now)[student_id]
+    if inputs.missing_plans:
+        ensure_study_plans(db, [student_id], now)
+        inputs = load_solver_inputs(db, [student_id], now)[student_id]
+    fixed_events, old_flex_events, unscheduled, flex_rows_map = _split_calendar(inputs.events, inputs.obligations, now)
+    slot_weights = inputs.slot_weights
+    limits = preference_limits(inputs.preferences)
+
+    if changed_obligation_ids is not None and old_flex_events:
+        try:
+            return _update_incremental(
+                db, student_id, set(changed_obligation_ids),
+                fixed_events, old_flex_events, unscheduled, flex_rows_map,
+                night_mode=night_mode, slot_min=slot_min, now=now, cancel=cancel, params=params,
+                slot_weights=slot_weights, limits=limits,
+            )
+        except RuntimeError as exc:
+            logger.info("Incremental re‑solve failed for student %s (%s) – falling back to full solve", student_id, exc)
 
+    fixed_payload, flex_payload = _full_payload(fixed_events, old_flex_events, unscheduled, flex_rows_map)
     if not flex_payload:
-        return
+        return SolvedSessions()
 
-    sessions = _solve_with_or_tools(fixed_payload, flex_payload)
+    sessions, _ = _solve_with_or_tools(
+        fixed_payload, flex_payload,
+        night_mode=night_mode, slot_min=slot_min, now=now, cancel=cancel, params=params,
+        slot_weights=slot_weights, **limits,
+    )
     _replace_flexible_events(db, student_id, old_flex_events, sessions)
-    logger.info("Inserted %d sessions", len(sessions))
+    logger.info("Scheduled %d sessions", len(sessions))
+    return sessions
+
+
+def _update_incremental(
+    db: Session,
+    student_id: int,
+    changed: Set[int],
+    fixed_events: List[EventRow],
+    old_flex_events: List[EventRow],
+    unscheduled: List[ObligationRow],
+    flex_map: Dict[Any, ObligationRow],
+    *,
+    night_mode: str = "soft",
+    slot_min: int = 30,
+    now: Optional[datetime] = None,
+    cancel: Optional[Any] = None,
+    params: SolverParams | str = "balanced",
+    slot_weights: Optional[Dict[str, float]] = None,
+    limits: Optional[Dict[str, float]] = None,
+) -> SolvedSessions:
+    """Re‑place only the sessions touched by ``changed``; freeze the rest."""
+    now = now or datetime.utcnow()
+    moved = [e for e in old_flex_events if e.task_key in changed]
+    kept  = [e for e in old_flex_events if e.task_key not in changed]
+    clashing_ids = _clashing_event_ids(kept, fixed_events)
+    displaced = [e for e in kept if e.event_id in clashing_ids]
+    frozen    = [e for e in kept if e.event_id not in clashing_ids]
+
+    # Changed obligations are re‑planned from their (possibly edited) row,
+    # less the hours of sessions already started (as the full path, which
+    # only regroups future sessions); displaced sessions keep only the hours
+    # they already had.
+    done = started_hours(db, student_id, (oid for oid in changed if oid in flex_map), now)
+    tasks = [_flex_to_task(flex_map[oid], done.get(oid, 0.0)) for oid in sorted(changed) if oid in flex_map]
+    tasks = [t for t in tasks if t["total_hours"] > 0]
+    tasks += [_flex_to_task(o) for o in unscheduled if o.task_key not in changed]
+    tasks += _regroup_old_flex(displaced, flex_map)
+
+    # Warm‑start changed obligations from where their sessions used to be
+    old_starts = _regroup_old_flex(moved, flex_map)
+    hints = {t["id"]: t["hints"] for t in old_starts}
+    for t in tasks:
+        t.setdefault("hints", hints.get(t["id"], []))
+
+    if not tasks and not moved and not displaced:
+        logger.info("Incremental re‑solve: nothing to move for student %s", student_id)
+        return SolvedSessions()
+
+    fixed_payload = [_ce_to_dict(e) for e in fixed_events + frozen]
+    logger.info(
+        "Incremental re‑solve: %d task(s) free, %d session(s) displaced, %d frozen",
+        len(tasks), len(moved) + len(displaced), len(frozen),
+    )
+    # No hours left to place (a target cut to what is already done): the
+    # empty result still goes through the diff, deleting the old sessions
+    sessions = SolvedSessions()
+    if tasks:
+        sessions, _ = _solve_with_or_tools(
+            fixed_payload, tasks,
+            night_mode=night_mode, slot_min=slot_min, now=now, cancel=cancel, params=params,
+            slot_weights=slot_weights, **(limits or {}),
+        )
+    _replace_flexible_events(db, student_id, moved + displaced, sessions)
+    logger.info("Scheduled %d sessions", len(sessions))
+    return sessions
 
 # ════════════════════════════════════════════════════════════════════════════
 # Helpers
 # ════════════════════════════════════════════════════════════════════════════
 
-def _ce_to_dict(ev: CalendarEvent) -> Dict[str, Any]:
-    return {"date": ev.date, "start": ev.start_time, "end": ev.end_time}
+def _split_calendar(
+    events: Iterable[EventRow],
+    obligations: Iterable[ObligationRow],
+    now: datetime,
+) -> Tuple[List[EventRow], List[EventRow], List[ObligationRow], Dict[Any, ObligationRow]]:
+    """Sort one student's rows (see :mod:`.data`) into ``(fixed, movable
+    sessions, unscheduled obligations, obligation by task key)`` as of ``now``.
+
+    Task keys are flexible obligation ids and :class:`.data.StudyKey` for
+    academic study plans."""
+    fixed_events, all_flex_events = _partition_events(events)
+
+    # Started sessions are history: they count as scheduled and block their
+    # slot while running (and count toward its day's study cap), but are
+    # never moved
+    old_flex_events = [e for e in all_flex_events if e.start_time >= now]
+    fixed_events = [e for e in fixed_events if e.end_time > now]
+    fixed_events += [e for e in all_flex_events if e.start_time < now < e.end_time]
+
+    flex_map = {o.task_key: o for o in obligations}
+    unscheduled = [o for o in flex_map.values() if not o.scheduled]
+    return fixed_events, old_flex_events, unscheduled, flex_map
 
 
-def _flex_to_task(ob: FlexibleObligation) -> Dict[str, Any]:
+def _full_payload(
+    fixed_events: List[EventRow],
+    old_flex_events: List[EventRow],
+    unscheduled: List[ObligationRow],
+    flex_map: Dict[Any, ObligationRow],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Solver input for a full re‑solve: every placed session is regrouped
+    into its task (hinted with the old starts) next to the new obligations."""
+    fixed_payload = [_ce_to_dict(e) for e in fixed_events]
+    flex_payload = _regroup_old_flex(old_flex_events, flex_map) + [_flex_to_task(o) for o in unscheduled]
+    return fixed_payload, flex_payload
+
+
+def preference_limits(preferences: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """``max_day_hours`` / ``min_gap_hours`` for :func:`_solve_with_or_tools`
+    from a student's stored preferences – the ``max_hours_per_day`` and
+    ``min_gap_between_sessions`` keys of :class:`.schemas.Preferences`.  A key
+    that is missing or not a number leaves its limit off."""
+    limits: Dict[str, float] = {}
+    for key, kwarg in (("max_hours_per_day", "max_day_hours"), ("min_gap_between_sessions", "min_gap_hours")):
+        try:
+            value = float((preferences or {})[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if value > 0:
+            limits[kwarg] = value
+    return limits
+
+
+def _ce_to_dict(ev: EventRow) -> Dict[str, Any]:
+    return {
+        "date": ev.start_time.replace(hour=0, minute=0, second=0, microsecond=0),
+        "start": ev.start_time,
+        "end": ev.end_time,
+        "session": ev.event_type != "fixed_obligation",  # a study session the solver may not move
+    }
+
+
+def _flex_to_task(ob: ObligationRow, done_hours: float = 0.0) -> Dict[str, Any]:
     c = ob.constraints or {}
     return {
-        "id": ob.obligation_id,
-        "total_hours": float(ob.weekly_target_hours),
+        "id": ob.task_key,
+        "total_hours": max(0.0, float(ob.weekly_target_hours) - done_hours),
         "session_hours": c.get("session_hours", 1),
+        "min_gap_hours": c.get("min_gap_hours", 0),
         "start_date": ob.start_date,
         "end_date": ob.end_date,
         "priority": ob.priority or 3,
     }
 
 
-def _partition_events(evts: List[CalendarEvent]) -> Tuple[List[CalendarEvent], List[CalendarEvent]]:
+def _partition_events(evts: Iterable[EventRow]) -> Tuple[List[EventRow], List[EventRow]]:
     fixed, flex = [], []
     for e in evts:
         if e.event_type == "fixed_obligation":
@@ -93,150 +399,847 @@ def _partition_events(evts: List[CalendarEvent]) -> Tuple[List[CalendarEvent], L
     return fixed, flex
 
 
-def _regroup_old_flex(events: List[CalendarEvent], flex_map: Dict[int, FlexibleObligation]) -> List[Dict[str, Any]]:
-    grouped: Dict[int, Dict[str, Any]] = {}
+def _clashing_event_ids(flex: List[EventRow], fixed: List[EventRow]) -> Set[int]:
+    """Ids of flexible events overlapping a fixed event or an earlier session.
+
+    Single sweep over the merged timeline; when a fixed event lands on a
+    session it is always the session that has to move.
+    """
+    timeline = sorted(
+        [(e.start_time, e.end_time, False, e) for e in fixed]
+        + [(e.start_time, e.end_time, True, e) for e in flex],
+        key=lambda r: r[0],
+    )
+    clashing: Set[int] = set()
+    blocker = None  # (end, movable, event) currently occupying the timeline
+    for start, end, movable, ev in timeline:
+        if blocker is not None and start < blocker[0]:
+            if movable:
+                clashing.add(ev.event_id)
+                continue
+            if blocker[1]:
+                clashing.add(blocker[2].event_id)
+                blocker = None
+        if blocker is None or end > blocker[0]:
+            blocker = (end, movable, ev)
+    return clashing
+
+
+def _regroup_old_flex(events: List[EventRow], flex_map: Dict[Any, ObligationRow]) -> List[Dict[str, Any]]:
+    grouped: Dict[Any, Dict[str, Any]] = {}
     for ev in events:
-        fid = ev.flexible_obligation_id
-        if not fid:
-            continue
-        base = flex_map.get(fid)
-        session_hours = (base.constraints or {}).get("session_hours", 1) if base else 1
-        t = grouped.setdefault(fid, {
-            "id": fid,
+        key = ev.task_key
+        base = flex_map.get(key)
+        if base is None:
+            continue  # obligation deleted / academic task done – its sessions go
+        c = base.constraints or {}
+        t = grouped.setdefault(key, {
+            "id": key,
             "total_hours": 0.0,
-            "session_hours": session_hours,
-            "start_date": base.start_date if base else None,
-            "end_date": base.end_date if base else None,
-            "priority": base.priority if base else 3,
+            "session_hours": c.get("session_hours", 1),
+            "min_gap_hours": c.get("min_gap_hours", 0),
+            "start_date": base.start_date,
+            "end_date": base.end_date,
+            "priority": base.priority or 3,
+            "hints": [],
         })
         t["total_hours"] += (ev.end_time - ev.start_time).seconds / 3600
+        t["hints"].append(ev.start_time)
+    for t in grouped.values():
+        t["hints"].sort()
     return list(grouped.values())
 
 
-def _replace_flexible_events(db: Session, student_id: int, old_flex: List[CalendarEvent], new: List[Dict[str, Any]]):
-    if old_flex:
-        db.execute(delete(CalendarEvent).where(CalendarEvent.event_id.in_([e.event_id for e in old_flex])))
-
-    db.add_all([
-        CalendarEvent(
-            student_id=student_id,
-            event_type="flexible_obligation",
-            flexible_obligation_id=s["flexible_obligation_id"],
-            date=s["date"],
-            start_time=s["start"],
-            end_time=s["end"],
-            priority=s.get("priority", 3),
-            status="scheduled",
-        )
-        for s in new
-    ])
+def _diff_sessions(
+    old_flex: List[EventRow], new: SolvedSessions,
+) -> Tuple[List[Tuple[int, int]], array, List[int]]:
+    """``(updates, inserts, deletes)`` turning ``old_flex`` into ``new``.
+
+    Sessions the solver left where they were keep their row untouched; a
+    session that moved takes over a stale row of the same task
+    (``(event_id, session index)`` in *updates*), so clients keep its
+    event_id.  Only the true surplus is inserted (indices into ``new``) or
+    deleted.
+    """
+    unchanged: Dict[Tuple[Any, datetime, datetime], List[EventRow]] = {}
+    for e in old_flex:
+        unchanged.setdefault((e.task_key, e.start_time, e.end_time), []).append(e)
+    moved = array("L")
+    for i in range(len(new)):
+        same = unchanged.get((new.task_key(i), new.start_time(i), new.end_time(i))) if unchanged else None
+        if same:
+            same.pop()
+        else:
+            moved.append(i)
+
+    stale: Dict[Any, List[int]] = {}  # task key → event ids free for reuse
+    for rows in unchanged.values():
+        for e in rows:
+            stale.setdefault(e.task_key, []).append(e.event_id)
+    updates, inserts = [], array("L")
+    for i in moved:
+        free = stale.get(new.task_key(i))
+        if free:
+            updates.append((free.pop(), i))
+        else:
+            inserts.append(i)
+    deletes = [eid for ids in stale.values() for eid in ids]
+    return updates, inserts, deletes
+
+
+def _session_row(student_id: int, s: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of the ``calendar_events`` row for a solver session."""
+    key = s["flexible_obligation_id"]
+    study = isinstance(key, StudyKey)
+    return {
+        "student_id": student_id,
+        "event_type": "study_session" if study else "flexible_obligation",
+        "flexible_obligation_id": None if study else key,
+        "study_session_id": key.session_id if study else None,
+        "date": s["date"],
+        "start_time": s["start"],
+        "end_time": s["end"],
+        "priority": s.get("priority", 3),
+        "status": "scheduled",
+    }
+
+
+def _moved_row(event_id: int, s: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk‑UPDATE parameters (by primary key) moving a row to session ``s``."""
+    return {"event_id": event_id, "date": s["date"], "start_time": s["start"], "end_time": s["end"]}
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int = WRITE_CHUNK) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _write_session_diff(
+    db: Session,
+    updates: Iterable[Dict[str, Any]],
+    inserts: Iterable[Dict[str, Any]],
+    deletes: List[int],
+) -> None:
+    """Apply a diff: bulk UPDATE, executemany INSERT, one DELETE.
+
+    ``updates`` / ``inserts`` may be generators – they are consumed
+    :data:`WRITE_CHUNK` rows at a time, so only one round of parameter
+    dicts exists at once.
+    """
+    for chunk in _chunks(updates):
+        db.execute(update(CalendarEvent), chunk)
+    for chunk in _chunks(inserts):
+        db.execute(insert(CalendarEvent), chunk)
+    if deletes:
+        db.execute(delete(CalendarEvent).where(CalendarEvent.event_id.in_(deletes)))
+
+
+def _replace_flexible_events(
+    db: Session, student_id: int, old_flex: List[EventRow], new: SolvedSessions,
+) -> Dict[str, int]:
+    """Write ``new`` over ``old_flex`` touching only rows that changed;
+    returns the row counts (``kept`` / ``updated`` / ``inserted`` / ``deleted``)."""
+    updates, inserts, deletes = _diff_sessions(old_flex, new)
+    _write_session_diff(
+        db,
+        (_moved_row(eid, new[i]) for eid, i in updates),
+        (_session_row(student_id, new[i]) for i in inserts),
+        deletes,
+    )
     db.commit()
+    availability_index.invalidate(student_id)  # bulk statements skip the ORM hooks
+    rows = {
+        "kept": len(new) - len(updates) - len(inserts),
+        "updated": len(updates),
+        "inserted": len(inserts),
+        "deleted": len(deletes),
+    }
+    logger.info("Session rows: %(kept)d kept, %(updated)d moved in place, %(inserted)d inserted, %(deleted)d deleted", rows)
+    return rows
 
 # ════════════════════════════════════════════════════════════════════════════
-# OR‑Tools solver (global NoOverlap)
+# OR‑Tools solver (time‑indexed: start literals, AtMostOne per slot)
 # ════════════════════════════════════════════════════════════════════════════
 
-def _solve_with_or_tools(fixed_events: List[Dict[str, Any]], flex_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Schedule with a *night‑time preference*:
+class _FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """Records the wall time at which the first incumbent was found."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.first_solution_s: float | None = None
+
+    def on_solution_callback(self) -> None:
+        if self.first_solution_s is None:
+            self.first_solution_s = self.WallTime()
 
-    * 23:00‑08:00 slots are **disfavoured**. We try a first pass where they are
-      completely forbidden. If the model is infeasible we relax the constraint
-      and allow night placement.
+
+@contextmanager
+def _stop_when_set(solver: cp_model.CpSolver, cancel: Optional[Any]):
+    """Poll ``cancel`` while the solver runs and stop the search once it is set."""
+    if cancel is None:
+        yield
+        return
+    done = threading.Event()
+
+    def watch() -> None:
+        while not done.wait(CANCEL_POLL_S):
+            if cancel.is_set():
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+        watcher.join()
+
+
+@dataclass
+class _Session:
+    task: Dict[str, Any]
+    dur: int                 # slots
+    domain: cp_model.Domain  # allowed starts, shared by the task's sessions
+    hint: Optional[int]      # previous start slot, if still allowed
+    deadline: Optional[int] = None  # slot at which the task's window closes
+    gap: int = 0             # slots to keep free between this task's sessions
+    pad: int = 0             # slots to keep free between any two sessions
+    per_day: Optional[int] = None  # most sessions of the task starting on one day
+
+    def starts_within(self, lo: int, hi: int, margins: bool = True) -> cp_model.Domain:
+        """Allowed starts that keep the session inside ``[lo, hi)``.
+
+        With ``margins`` it also stays half a gap clear of either edge, so
+        sessions solved in neighbouring blocks keep their gap.
+        """
+        edge = max(self.gap, self.pad)
+        head, tail = (edge - edge // 2, edge // 2) if margins else (0, 0)
+        return self.domain.intersection_with(cp_model.Domain(lo + head, hi - tail - self.dur))
+
+
+@dataclass
+class _Block:
+    """Sessions solved together – a week of one component, or all of it."""
+    component: int
+    lo: int  # sessions start and end within [lo, hi) slots
+    hi: int
+    sessions: List[_Session]
+    span: Tuple[int, int]  # the component's [lo, hi)
+    whole: bool = False    # nothing left to merge with
+    result: Optional[Dict[str, Any]] = None
+
+
+@dataclass(frozen=True)
+class _Costs:
+    """Per‑solve cost tables shared by every block."""
+    offset: int          # slot 0's position in the Monday‑based week
+    tod: List[int]       # time‑of‑day cost per slot of the week
+    night: List[bool]    # slot of the week carries the night penalty
+    deadline_buffer: int  # slots
+
+    def night_cost(self, block_slots: int) -> int:
+        # More than earliness, deadline and time of day can ever save in the block
+        return 5 * block_slots + DEADLINE_WEIGHT * self.deadline_buffer + max(self.tod) + 1
+
+
+@dataclass(frozen=True)
+class _DayLimits:
+    """Per‑day caps shared by every block."""
+    slots_per_day: int
+    session_slots: Optional[int] = None  # study slots per day, all tasks together
+    used: Tuple[Tuple[int, int], ...] = ()  # (day, study slots of sessions that cannot move)
+
+    @property
+    def active(self) -> bool:
+        return self.session_slots is not None
+
+    def day_slots(self, day: int) -> int:
+        """Study slots still free on ``day``."""
+        return max(0, self.session_slots - dict(self.used).get(day, 0))
+
+
+def _priority(task: Dict[str, Any]) -> int:
+    return min(5, max(1, task.get("priority") or 3))
+
+
+def _deadline_cost(sp: _Session, start: int, costs: _Costs) -> int:
+    """Slots of the session that fall inside the buffer before its deadline."""
+    if sp.deadline is None:
+        return 0
+    return DEADLINE_WEIGHT * max(0, start + sp.dur - (sp.deadline - costs.deadline_buffer))
+
+
+def _slot_cost(sp: _Session, start: int, costs: _Costs, night_cost: int) -> int:
+    i = (start + costs.offset) % len(costs.tod)
+    return (
+        _priority(sp.task) * start
+        + _deadline_cost(sp, start, costs)
+        + costs.tod[i]
+        + night_cost * costs.night[i]
+    )
+
+
+def _split_blocks(specs: List[_Session], block_slots: int, join_slots: int = 1) -> List[_Block]:
+    """Partition sessions into independently solvable blocks.
+
+    Sessions whose start windows never overlap (transitively) cannot collide,
+    so each connected component is its own problem; with ``join_slots`` (a
+    day, when daily caps apply) components that touch the same
+    ``join_slots`` bucket are merged too.  A component spanning
+    several ``block_slots`` weeks is cut further: every session is assigned
+    to one week its window reaches – the week of its hint if it has one,
+    otherwise spread evenly over the task's free capacity – and must then
+    start and end inside that week.
+    """
+    by_lo = sorted(specs, key=lambda sp: sp.domain.min())
+    components: List[List[_Session]] = []
+    comp_end = None
+    for sp in by_lo:
+        if comp_end is None or sp.domain.min() >= -(-comp_end // join_slots) * join_slots:
+            components.append([])
+            comp_end = sp.domain.max() + sp.dur + sp.pad
+        components[-1].append(sp)
+        comp_end = max(comp_end, sp.domain.max() + sp.dur + sp.pad)
+
+    blocks: List[_Block] = []
+    for c, members in enumerate(components):
+        span = (min(sp.domain.min() for sp in members), max(sp.domain.max() + sp.dur for sp in members))
+        weeks = _assign_weeks(members, span, block_slots)
+        if weeks is None or len(set(weeks.values())) == 1:
+            blocks.append(_Block(c, span[0], span[1], members, span, whole=True))
+            continue
+        for k in sorted(set(weeks.values())):
+            week = [sp for sp in members if weeks[id(sp)] == k]
+            blocks.append(_Block(c, k * block_slots, (k + 1) * block_slots, week, span))
+    return blocks
+
+
+def _assign_weeks(members: List[_Session], span: Tuple[int, int], block_slots: int) -> Optional[Dict[int, int]]:
+    """Map each session (by ``id``) to a week index, or ``None`` if some task
+    cannot fit a session inside any single week."""
+    first_week, last_week = span[0] // block_slots, (span[1] - 1) // block_slots
+    if first_week == last_week:
+        return None
+    by_task: Dict[int, List[_Session]] = {}
+    for sp in members:
+        by_task.setdefault(id(sp.task), []).append(sp)
+
+    weeks: Dict[int, int] = {}
+    for sessions in by_task.values():
+        sp0 = sessions[0]
+        inside = {
+            k: sp0.starts_within(k * block_slots, (k + 1) * block_slots)
+            for k in range(first_week, last_week + 1)
+        }
+        capacity = [(k, d.size()) for k, d in inside.items() if not d.is_empty()]  # (week, allowed starts)
+        if not capacity:
+            return None
+        spread = []
+        for sp in sessions:
+            k = sp.hint // block_slots if sp.hint is not None else None
+            if k in inside and inside[k].contains(sp.hint):
+                weeks[id(sp)] = k
+            else:
+                spread.append(sp)
+        # Place the j‑th remaining session at the (j + ½)/n quantile of capacity
+        total = sum(size for _, size in capacity)
+        for j, sp in enumerate(spread):
+            target, acc = (j + 0.5) / len(spread) * total, 0
+            for k, size in capacity:
+                acc += size
+                if acc >= target:
+                    break
+            weeks[id(sp)] = k
+    return weeks
+
+
+def _absorb_neighbours(blocks: List[_Block], failed: List[_Block]) -> Tuple[List[_Block], List[_Block]]:
+    """Merge every failed block with the blocks on either side of it.
+
+    Returns ``(blocks, pending)``: the new block list and the merged blocks
+    that still need solving (the others keep their results).
+    """
+    failed_ids = {id(b) for b in failed}
+    out: List[_Block] = []
+    pending: List[_Block] = []
+    for c in sorted({b.component for b in blocks}):
+        row = sorted((b for b in blocks if b.component == c), key=lambda b: b.lo)
+        marked = [False] * len(row)
+        for i, b in enumerate(row):
+            if id(b) in failed_ids:
+                for j in (i - 1, i, i + 1):
+                    if 0 <= j < len(row):
+                        marked[j] = True
+        run: List[_Block] = []
+        for b, mark in zip(row + [None], marked + [False]):
+            if mark:
+                run.append(b)
+                continue
+            if run:
+                whole = len(run) == len(row)
+                merged = _Block(
+                    c,
+                    run[0].span[0] if whole else run[0].lo,
+                    run[0].span[1] if whole else run[-1].hi,
+                    [sp for r in run for sp in r.sessions],
+                    run[0].span,
+                    whole=whole,
+                )
+                out.append(merged)
+                pending.append(merged)
+                run = []
+            if b is not None:
+                out.append(b)
+    return out, pending
+
+
+def _solve_block(
+    block: _Block,
+    costs: _Costs,
+    params: SolverParams,
+    cancel: Optional[Any],
+    limits: Optional[_DayLimits] = None,
+) -> Dict[str, Any]:
+    """Build and solve one block; ``values`` is ``None`` when it has no solution.
+
+    The model is time‑indexed: one literal per (task, allowed start slot) with
+    ``sum == sessions`` per task and at most one literal covering any slot.
+    Interchangeable sessions share one set of literals, and every cost term
+    is a precomputed per‑slot coefficient – the LP
+    relaxation is tight and blocks usually solve to proven optimality.
+
+    The global gap pads each literal's coverage, so it rides on the same
+    per‑slot constraints; daily caps add one linear sum per day (and per
+    capped task and day) – the model stays linear in the number of slots.
+    """
+    m = cp_model.CpModel()
+    night_cost = costs.night_cost(block.hi - block.lo)
+    period = len(costs.tod)
+    # Sessions with the same length, window, priority and deadline cost the
+    # same per slot up to a constant – they share one set of literals.  A
+    # task with a minimum gap or a daily cap keeps its own set.
+    classes: Dict[Tuple, List[_Session]] = {}
+    for sp in block.sessions:
+        bounds = tuple(sp.starts_within(block.lo, block.hi, margins=not block.whole).flattened_intervals())
+        deadline = sp.deadline if sp.deadline is not None and bounds[-1] + sp.dur > sp.deadline - costs.deadline_buffer else None
+        key = (sp.dur, bounds, _priority(sp.task), deadline, id(sp.task) if sp.gap or sp.per_day else None)
+        classes.setdefault(key, []).append(sp)
+
+    covering: Dict[int, List[cp_model.IntVar]] = {}  # slot → literals of starts covering it
+    day_load: Dict[int, List[Tuple[int, cp_model.IntVar]]] = {}  # day → (slots on that day, literal)
+    spd = limits.slots_per_day if limits else 0
+    starts: List[Tuple[List[_Session], List[Tuple[int, cp_model.IntVar]]]] = []
+    objective = []
+    for n, ((dur, bounds, *_), sessions) in enumerate(classes.items()):
+        sp = sessions[0]
+        hints = Counter(x.hint for x in sessions if x.hint is not None)
+        lits = []
+        for lo, hi in zip(bounds[::2], bounds[1::2]):
+            for t in range(lo, hi + 1):
+                lit = m.NewBoolVar(f"x_{n}_{t}")
+                if hints[t]:
+                    m.AddHint(lit, 1)
+                objective.append(_slot_cost(sp, t, costs, night_cost) * lit)
+                for u in range(t, t + dur + sp.pad):
+                    covering.setdefault(u, []).append(lit)
+                if limits and limits.active:
+                    for d in range(t // spd, (t + dur - 1) // spd + 1):
+                        day_load.setdefault(d, []).append((min(t + dur, (d + 1) * spd) - max(t, d * spd), lit))
+                lits.append((t, lit))
+        m.Add(sum(lit for _, lit in lits) == len(sessions))
+        if sp.per_day and spd:
+            task_days: Dict[int, List[cp_model.IntVar]] = {}
+            for t, lit in lits:
+                task_days.setdefault(t // spd, []).append(lit)
+            for day_lits in task_days.values():
+                if len(day_lits) > sp.per_day:
+                    m.Add(sum(day_lits) <= sp.per_day)
+        if sp.gap > sp.pad:
+            # Any two of the task's starts lie at least dur + gap apart
+            for i, (t, _) in enumerate(lits):
+                window = [lit for u, lit in lits[i:i + dur + sp.gap] if u < t + dur + sp.gap]
+                if len(window) > 1:
+                    m.AddAtMostOne(window)
+        starts.append((sessions, lits))
+
+    for lits in covering.values():
+        if len(lits) > 1:
+            m.AddAtMostOne(lits)
+    for d, load in day_load.items():
+        cap = limits.day_slots(d)
+        if sum(w for w, _ in load) > cap:
+            m.Add(sum(w * lit for w, lit in load) <= cap)
+    # Earliness is counted from each task's own window start
+    m.Minimize(sum(objective) - sum(_priority(sp.task) * sp.domain.min() for sp in block.sessions))
+
+    solver = cp_model.CpSolver()
+    params.apply(solver)
+    # The time‑indexed model is already tight: a full LP relaxation of the
+    # slot cliques proves optimality quickly, while presolve only costs time
+    solver.parameters.linearization_level = 2
+    solver.parameters.cp_model_presolve = False
+    timer = _FirstSolutionTimer()
+    with _stop_when_set(solver, cancel):
+        status = solver.Solve(m, timer)
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    values = None
+    terms = dict.fromkeys(("earliness", "deadline", "time_of_day", "night"), 0)
+    if found:
+        by_session: Dict[int, int] = {}
+        for sessions, lits in starts:
+            # Hinted sessions take back their old slot, the rest fill in order
+            left = {t for t, lit in lits if solver.BooleanValue(lit)}
+            for x in sessions:
+                if x.hint in left:
+                    by_session[id(x)] = x.hint
+                    left.discard(x.hint)
+            rest = sorted(left)
+            for x in sessions:
+                if id(x) not in by_session:
+                    by_session[id(x)] = rest.pop(0)
+        values = [by_session[id(x)] for x in block.sessions]
+        # Objective split by component (sums to the objective value)
+        for v, sp in zip(values, block.sessions):
+            terms["earliness"] += _priority(sp.task) * (v - sp.domain.min())
+            terms["deadline"] += _deadline_cost(sp, v, costs)
+            i = (v + costs.offset) % period
+            terms["time_of_day"] += costs.tod[i]
+            terms["night"] += night_cost * costs.night[i]
+    return {
+        "status": solver.StatusName(status),
+        "values": values,
+        "objective": solver.ObjectiveValue() if found else 0.0,
+        "best_bound": solver.BestObjectiveBound() if found else 0.0,
+        "terms": terms,
+        "first_solution_s": timer.first_solution_s or solver.WallTime(),
+        "variables": len(m.Proto().variables),
+        "constraints": len(m.Proto().constraints),
+    }
+
+
+def _hint_stats(specs: List[_Session], starts: Iterable[int]) -> Dict[str, int]:
+    """``hinted`` sessions and ``hints_kept``: hinted slots the placement reuses."""
+    hinted = [(v, sp.hint) for sp, v in zip(specs, starts) if sp.hint is not None]
+    # Sessions of a task are interchangeable – count hinted slots reused by any of them
+    kept = sum((Counter(v for v, _ in hinted) & Counter(h for _, h in hinted)).values())
+    return {"hinted": len(hinted), "hints_kept": kept}
+
+
+def _solve_with_or_tools(
+    fixed_events: List[Dict[str, Any]],
+    flex_tasks: List[Dict[str, Any]],
+    *,
+    night_mode: str = "soft",
+    slot_min: int = 30,
+    now: Optional[datetime] = None,
+    cancel: Optional[Any] = None,
+    params: SolverParams | str = "balanced",
+    decompose: bool = False,
+    slot_weights: Optional[Dict[str, float]] = None,
+    max_day_hours: Optional[float] = None,
+    min_gap_hours: float = 0,
+    cache: Optional[SolveCache] = solve_cache,
+) -> Tuple[SolvedSessions, Dict[str, Any]]:
+    """Schedule with a *night‑time preference* in a single solve:
+
+    * Each session costs priority‑weighted earliness, slack lost near its
+      deadline and a time‑of‑day cost from ``slot_weights`` (the behaviour
+      analyzer's ``"Monday-9"`` → efficiency map); see the weights above.
+    * 23:00‑08:00 starts are **disfavoured**. In ``"soft"`` mode each session
+      placed there costs more than any other placement, so night slots are
+      only used when the day is full; ``"hard"`` forbids them outright.
+    * Every returned session carries a ``night`` flag.
+    * ``max_day_hours`` caps the study time on any calendar day,
+      ``min_gap_hours`` keeps every pair of sessions apart – both count the
+      fixed events flagged ``session`` (frozen or running sessions) – and a task's
+      ``max_per_day`` limits how many of its sessions start on one day
+      (a task's own ``min_gap_hours`` only separates its sessions).
+
+    Sessions come back as :class:`SolvedSessions` (slot arrays, no per‑session
+    objects) for the write‑back to stream from.
+
+    The grid is ``slot_min`` minutes (15/30/60) and only covers
+    ``[now, latest task end]`` – past fixed events and expired tasks never
+    reach the model; tasks without an end date get :data:`OPEN_TASK_WINDOW`.
+
+    Tasks may carry ``hints`` – the previous session starts – which are fed to
+    CP‑SAT as a warm start so the search begins from the old schedule.
+
+    Sessions are split into connected components of overlapping windows (see
+    :func:`_split_blocks`), which are independent and solved in parallel
+    threads.  ``decompose=True`` also cuts components into :data:`BLOCK_DAYS`
+    weeks so solve time grows with the number of weeks – but each session's
+    week is picked heuristically, so the objective can be far from optimal,
+    the status is at best ``"FEASIBLE"`` and ``best_bound`` is ``None``.  The
+    monolithic model still proves optimality on a year‑long calendar within
+    the "balanced" time limit, so it is the default.  A block without a
+    solution is merged with its neighbours and re‑solved.
+
+    Setting ``cancel`` (``Event``‑like) stops the search and raises
+    :class:`SolveCancelled`.
+
+    Placements are memoised in ``cache`` (see :mod:`.cache`) under a hash of
+    the model input relative to the grid, so an unchanged problem skips the
+    search – ``stats["cache"]`` says ``"hit"`` or ``"miss"``; ``None``
+    always solves.
+
+    Returns ``(sessions, stats)``; ``stats`` holds the per‑solve metrics that
+    are also logged (horizon, interval counts, build/solve time, hints) plus
+    ``objective_terms``, the objective split by component.
     """
     import math
 
-    model = cp_model.CpModel()
+    if night_mode not in NIGHT_MODES:
+        raise ValueError(f"Unknown night_mode {night_mode!r}")
+    if slot_min not in SLOT_MINUTES:
+        raise ValueError(f"slot_min must be one of {SLOT_MINUTES}, got {slot_min}")
+    params = solver_params(params)
+    t_build = time.perf_counter()
 
-    now = datetime.utcnow()
-    earliest_start_raw = min([now] + [t["start_date"] for t in flex_tasks if t["start_date"]] + [f["start"] for f in fixed_events])
-    earliest_start = earliest_start_raw.replace(hour=0, minute=0, second=0, microsecond=0)
-    latest_end  = max([now] + [t["end_date"] for t in flex_tasks if t["end_date"]] + [f["end"] for f in fixed_events])
-    horizon_end = latest_end.replace(hour=23, minute=59)
+    now = now or datetime.utcnow()
+    # Slot 0 is today's midnight so day windows line up with slot % slots_per_day
+    earliest_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    live_tasks = [t for t in flex_tasks if not t["end_date"] or t["end_date"] > now]
+    if len(live_tasks) < len(flex_tasks):
+        logger.info("Skipping %d task(s) whose window already ended", len(flex_tasks) - len(live_tasks))
+    flex_tasks = live_tasks
+    if any(not t["end_date"] for t in flex_tasks):
+        horizon_end = max([now + OPEN_TASK_WINDOW] + [t["end_date"] for t in flex_tasks if t["end_date"]])
+    else:
+        horizon_end = max([now] + [t["end_date"] for t in flex_tasks])
 
-    slot_min = 30
-    n_slots = int((horizon_end - earliest_start).total_seconds() / 60 / slot_min)
+    slots_per_day = 24 * 60 // slot_min
+    n_slots = math.ceil((horizon_end - earliest_start).total_seconds() / 60 / slot_min)
     if n_slots <= 0:
         raise ValueError("Empty horizon")
 
     def idx(dt: datetime) -> int:
         return int((dt - earliest_start).total_seconds() / 60 / slot_min)
 
-    # Helper to compute slot -> datetime
-    def slot_time(i: int) -> datetime:
-        return earliest_start + timedelta(minutes=i * slot_min)
+    def idx_ceil(dt: datetime) -> int:
+        return math.ceil((dt - earliest_start).total_seconds() / 60 / slot_min)
+
+    first_slot = idx_ceil(now)
+
+    # Fixed intervals (slot index, duration, study session) – only what
+    # overlaps the horizon
+    fixed_slots = [
+        (max(0, idx(f["start"])), idx_ceil(min(f["end"], horizon_end)) - max(0, idx(f["start"])), f.get("session", False))
+        for f in fixed_events
+        if f["end"] > now and f["start"] < horizon_end
+    ]
+    # Sessions that cannot move (frozen or running) keep the global gap like
+    # any other session: their busy interval is widened by it on both sides
+    pad_slots = math.ceil(min_gap_hours * 60 / slot_min)
+
+    # Allowed start domains – computed once, shared by every session ------
+    # Day windows (08:00‑23:00 starts) as a handful of intervals instead of a
+    # forbidden‑value table per session; fixed events are cut out as well,
+    # widened by the session length so a session cannot run into them.
+    n_days = n_slots // slots_per_day + 1
+    day_lo = math.ceil(DAY_START_HOUR * 60 / slot_min)
+    day_hi = math.ceil(NIGHT_START_HOUR * 60 / slot_min) - 1
+    daytime = cp_model.Domain.FromIntervals(
+        [[d * slots_per_day + day_lo, d * slots_per_day + day_hi] for d in range(n_days)]
+    )
+    busy = cp_model.Domain.FromIntervals(
+        [[s - pad_slots * session, s + d - 1 + pad_slots * session] for s, d, session in fixed_slots if d > 0]
+    )
+    domain_cache: Dict[int, cp_model.Domain] = {}
+
+    def allowed_starts(dur_slots: int) -> cp_model.Domain:
+        if dur_slots not in domain_cache:
+            base = daytime if night_mode == "hard" else cp_model.Domain(first_slot, n_slots)
+            clash = busy.addition_with(cp_model.Domain(1 - dur_slots, 0))
+            domain_cache[dur_slots] = base.intersection_with(clash.complement())
+        return domain_cache[dur_slots]
+
+    def is_night(slot: int) -> bool:
+        return not day_lo <= slot % slots_per_day <= day_hi
+
+    # Per‑slot cost vectors over one week, indexed from Monday 00:00 ---------
+    week_offset = earliest_start.weekday() * slots_per_day
+    tod_cost = [0] * (7 * slots_per_day)
+    if slot_weights:
+        for i in range(len(tod_cost)):
+            key = f"{WEEKDAYS[i // slots_per_day]}-{(i % slots_per_day) * slot_min // 60}"
+            tod_cost[i] = round(EFFICIENCY_SCALE * (1 - slot_weights.get(key, DEFAULT_SLOT_WEIGHT)))
+    costs = _Costs(
+        offset=week_offset,
+        tod=tod_cost,
+        night=[night_mode == "soft" and is_night(i) for i in range(len(tod_cost))],
+        deadline_buffer=int(DEADLINE_BUFFER.total_seconds() // 60 // slot_min),
+    )
+
+    # Daily caps in slots, less what sessions that cannot move already use
+    day_cap = int(max_day_hours * 60 // slot_min) if max_day_hours is not None else None
+    used: Counter = Counter()
+    if day_cap is not None:
+        for start, dur, session in fixed_slots:
+            if not session:
+                continue
+            for d in range(start // slots_per_day, (start + dur - 1) // slots_per_day + 1):
+                used[d] += min(start + dur, (d + 1) * slots_per_day) - max(start, d * slots_per_day)
+    limits = _DayLimits(slots_per_day, day_cap, tuple(sorted(used.items())))
 
     # ------------------------------------------------------------------
-    # Build intervals (fixed + flex) and a list of candidate models
+    # Session specs – one per session, domains shared per task
     # ------------------------------------------------------------------
-    def build_model(block_night: bool):
-        m = cp_model.CpModel()
-        intervals = []
-        session_records = []
-
-        # Fixed intervals ------------------------------------------------
-        for f in fixed_events:
-            s = idx(f["start"])
-            dur = math.ceil((f["end"] - f["start"]).total_seconds() / 60 / slot_min)
-            intervals.append(m.NewFixedSizeIntervalVar(s, dur, f"fixed_{s}"))
-
-        # Night slots ----------------------------------------------------
-        night_block = set()
-        if block_night:
-            for s in range(n_slots):
-                t = slot_time(s)
-                if t.hour >= 23 or t.hour < 8:
-                    night_block.add(s)
-
-        # Flexible sessions ---------------------------------------------
-        for task in flex_tasks:
-            dur_slots = math.ceil(task["session_hours"] * 60 / slot_min)
-            n_sess = max(1, int(math.ceil(task["total_hours"] / task["session_hours"])))
-
-            window_start = task["start_date"] or earliest_start
-            window_end   = (task["end_date"] or horizon_end) - timedelta(minutes=dur_slots * slot_min)
-            low, high = max(0, idx(window_start)), min(n_slots - dur_slots, idx(window_end))
-            if high < low:
-                raise RuntimeError(f"No window for task {task['id']}")
-
-            for i in range(n_sess):
-                start = m.NewIntVar(low, high, f"s_{task['id']}_{i}")
-                if block_night and night_block:
-                    m.AddForbiddenAssignments([start], [[b] for b in night_block])
-                ivar  = m.NewIntervalVar(start, dur_slots, start + dur_slots, f"iv_{task['id']}_{i}")
-                intervals.append(ivar)
-                session_records.append((start, dur_slots, task))
-
-        m.AddNoOverlap(intervals)
-
-        makespan = m.NewIntVar(0, n_slots, "makespan")
-        for s, d, _ in session_records:
-            m.Add(makespan >= s + d)
-        m.Minimize(makespan)
-
-        return m, session_records
-
-    # First attempt: night blocked --------------------------------------
-    for attempt, allow_night in enumerate([False, True], start=1):
-        mdl, rec = build_model(block_night=not allow_night)
-        solver = cp_model.CpSolver(); solver.parameters.max_time_in_seconds = 10
-        result = solver.Solve(mdl)
-        if result in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            session_records = rec
-            break
-        if allow_night:
-            raise RuntimeError("No feasible schedule, even with night hours allowed")
+    specs: List[_Session] = []
+    for task in flex_tasks:
+        dur_slots = math.ceil(task["session_hours"] * 60 / slot_min)
+        n_sess = max(1, int(math.ceil(task["total_hours"] / task["session_hours"])))
+
+        window_start = task["start_date"] or now
+        window_end   = (task["end_date"] or horizon_end) - timedelta(minutes=dur_slots * slot_min)
+        low, high = max(first_slot, idx_ceil(window_start)), min(n_slots - dur_slots, idx(window_end))
+        if high < low:
+            raise RuntimeError(f"No window for task {task['id']}")
+
+        domain = allowed_starts(dur_slots).intersection_with(cp_model.Domain(low, high))
+        if domain.is_empty():
+            raise RuntimeError(f"No free {night_mode == 'hard' and 'daytime ' or ''}slot for task {task['id']}")
+
+        if day_cap is not None and dur_slots > day_cap:
+            raise RuntimeError(f"Sessions of task {task['id']} are longer than max_day_hours")
+
+        deadline = idx(task["end_date"]) if task["end_date"] else None
+        gap_slots = math.ceil(task.get("min_gap_hours", 0) * 60 / slot_min)
+        task_hints = task.get("hints") or []
+        for i in range(n_sess):
+            hint = idx(task_hints[i]) if i < len(task_hints) else None
+            hint = hint if hint is not None and domain.contains(hint) else None
+            specs.append(_Session(task, dur_slots, domain, hint, deadline, gap_slots, pad_slots, task.get("max_per_day")))
+
+    def placement(starts: Iterable[int]) -> SolvedSessions:
+        outs = SolvedSessions(earliest_start, slot_min, (day_lo, day_hi))
+        task_index: Dict[int, int] = {}
+        for spec, start in zip(specs, starts):
+            key = id(spec.task)
+            if key not in task_index:
+                task_index[key] = outs.add_task(spec.task["id"], spec.task.get("priority", 3))
+            outs.append(start, spec.dur, task_index[key])
+        return outs
+
+    # Fixed events are already cut out of every domain, so the sub‑models
+    # only need the per‑slot AtMostOne over session start literals.
+    block_slots = BLOCK_DAYS * slots_per_day if decompose else n_slots + 1
+
+    # Everything the search sees, relative to the grid: task ids and
+    # absolute dates are left out, the task a session belongs to is not.
+    # Hints only steer the search, so a re‑solve warm‑started from the
+    # cached answer hits – unless a week cut pins sessions by their hint.
+    cache_key = None
+    if cache is not None and cache.enabled:
+        ordinal: Dict[int, int] = {}
+        cache_key = canonical_key(
+            costs, limits, block_slots, params,
+            [
+                (ordinal.setdefault(id(sp.task), len(ordinal)), sp.dur, sp.domain.flattened_intervals(),
+                 sp.hint if decompose else None, sp.deadline, sp.gap, sp.pad, sp.per_day, _priority(sp.task))
+                for sp in specs
+            ],
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            starts, cached_stats = cached
+            stats = dict(
+                cached_stats, **_hint_stats(specs, starts),
+                cache="hit", build_s=round(time.perf_counter() - t_build, 4), solve_s=0.0,
+            )
+            logger.info("Solve cache hit: %d sessions, no search (%s)", len(specs), cache.stats())
+            return placement(starts), stats
+
+    # Blocks are day‑aligned weeks; daily caps also need whole days per component
+    blocks = _split_blocks(specs, block_slots, slots_per_day if day_cap is not None else 1)
+    build_s = time.perf_counter() - t_build
+
+    # ------------------------------------------------------------------
+    # Solve blocks in parallel; a block that fails absorbs a neighbour
+    # ------------------------------------------------------------------
+    cores = os.cpu_count() or 1
+    budget = min(params.num_workers or cores, cores)  # more workers than cores only interleave
+    threads = max(1, min(len(blocks), cores, budget))
+    block_params = SolverParams(
+        num_workers=max(1, budget // threads),
+        # Blocks run in waves of ``threads``; each wave gets its share of the budget
+        time_limit_s=max(
+            min(params.time_limit_s, MIN_BLOCK_TIME_S),
+            params.time_limit_s * min(1.0, threads / max(1, len(blocks))),
+        ),
+        relative_gap=params.relative_gap,
+    )
+    def solve(block: _Block) -> _Block:
+        block.result = _solve_block(block, costs, block_params, cancel, limits)
+        return block
+
+    t_solve = time.perf_counter()
+    retries = 0
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = blocks
+        while pending:
+            list(pool.map(solve, pending))
+            if cancel is not None and cancel.is_set():
+                raise SolveCancelled("superseded by newer input")
+            failed = [b for b in pending if b.result["values"] is None]
+            if not failed:
+                break
+            for b in failed:
+                if b.whole:
+                    raise RuntimeError(f"No feasible schedule ({night_mode} night mode, {b.result['status']})")
+            retries += len(failed)
+            blocks, pending = _absorb_neighbours(blocks, failed)
+    solve_s = time.perf_counter() - t_solve
+
+    results = [b.result for b in blocks]
+    # Components are independent, so their bounds add up; a week cut fixed
+    # each session's week beforehand and bounds only that choice
+    exact = all(b.whole for b in blocks)
+    values = {id(spec): v for b in blocks for spec, v in zip(b.sessions, b.result["values"])}
+    stats = {
+        "status": "OPTIMAL" if exact and all(r["status"] == "OPTIMAL" for r in results) else "FEASIBLE",
+        "objective": sum(r["objective"] for r in results),
+        "best_bound": sum(r["best_bound"] for r in results) if exact else None,
+        "objective_terms": {
+            term: sum(r["terms"][term] for r in results) for term in ("earliness", "deadline", "time_of_day", "night")
+        },
+        "time_limit_s": params.time_limit_s,
+        "num_workers": params.num_workers,
+        "slot_min": slot_min,
+        "horizon_slots": n_slots - first_slot,
+        "horizon_hours": round((n_slots - first_slot) * slot_min / 60, 1),
+        "fixed_intervals": len(fixed_slots),
+        "fixed_dropped": len(fixed_events) - len(fixed_slots),
+        "session_intervals": len(specs),
+        "model_variables": sum(r["variables"] for r in results),
+        "model_constraints": sum(r["constraints"] for r in results),
+        "blocks": len(blocks),
+        "block_retries": retries,
+        "build_s": round(build_s, 4),
+        "solve_s": round(solve_s, 4),
+        "first_solution_s": round(max((r["first_solution_s"] for r in results), default=0.0), 4),
+        **_hint_stats(specs, [values[id(spec)] for spec in specs]),
+    }
+    logger.info(
+        "Solve metrics: horizon %(horizon_slots)d×%(slot_min)d min (%(horizon_hours)sh), "
+        "intervals %(fixed_intervals)d fixed (+%(fixed_dropped)d dropped) / %(session_intervals)d sessions "
+        "in %(blocks)d block(s) (%(block_retries)d merged), "
+        "build %(build_s).3fs, %(status)s after %(solve_s).3fs (first %(first_solution_s).3fs, "
+        "objective %(objective)g, bound %(best_bound)s, terms %(objective_terms)s), "
+        "hints kept %(hints_kept)d/%(hinted)d",
+        stats,
+    )
 
     # Build output ------------------------------------------------------
-    outs = []
-    for s, d, t in session_records:
-        start_idx = solver.Value(s)
-        start_dt  = earliest_start + timedelta(minutes=start_idx * slot_min)
-        end_dt    = start_dt + timedelta(minutes=d * slot_min)
-        outs.append({
-            "flexible_obligation_id": t["id"],
-            "priority": t.get("priority", 3),
-            "date": start_dt.replace(hour=0, minute=0, second=0, microsecond=0),
-            "start": start_dt,
-            "end": end_dt,
-        })
-    return outs
+    outs = placement(values[id(spec)] for spec in specs)
+    stats["night_sessions"] = sum(map(is_night, outs.start))
+    if stats["night_sessions"]:
+        logger.info("%d of %d sessions placed in night slots", stats["night_sessions"], len(outs))
+    if cache_key is not None:
+        cache.put(cache_key, array("l", outs.start), dict(stats))
+        stats["cache"] = "miss"
+    return outs, stats
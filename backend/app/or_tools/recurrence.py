@@ -0,0 +1,142 @@
+# recurrence.py – Recurring fixed obligations
+"""Fixed obligations are stored once, as their recurrence rule, and expanded
+for whatever window is read – the calendar endpoint, the free‑time index and
+the solver's loader all go through :func:`load_occurrences`.
+
+Rule (a ``fixed_obligations`` row): every day in ``days_of_week`` from
+``start_date`` to ``end_date`` (open‑ended when null), repeating every week,
+every other week (``biweekly``) or every 30 days (``monthly``), from
+``start_time`` to ``end_time``.
+
+Exceptions are ``calendar_events`` rows carrying the obligation's
+``fixed_obligation_id`` and the occurrence's ``date``: a moved occurrence keeps
+its original ``date`` with the new times, a cancelled one has
+``status = 'cancelled'``.  A stored row always wins over the rule, so rows
+materialised before rules were expanded lazily keep working as they are.
+"""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Container, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.schedule import CalendarEvent, FixedObligation
+
+WEEKDAYS = {
+    "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
+    "Friday": 4, "Saturday": 5, "Sunday": 6,
+}
+RECURRENCE_STEP_DAYS = {"weekly": 7, "biweekly": 14, "monthly": 30}  # anything else repeats weekly
+EXPANSION_HORIZON = timedelta(weeks=26)  # look‑ahead of the solver and the free‑time index
+CANCELLED = "cancelled"
+_OCCURRENCE_ID = re.compile(r"fixed-(\d+)-(\d{8})")
+
+
+class Occurrence(NamedTuple):
+    student_id: int
+    obligation_id: int
+    name: str
+    course_id: Optional[int]
+    priority: Optional[int]
+    date: datetime  # midnight of the occurrence – the key of its exception row
+    start_time: datetime
+    end_time: datetime
+
+
+def occurrence_id(obligation_id: int, day: date | datetime) -> str:
+    """Stable id of an occurrence that has no row – what clients get as its
+    ``event_id`` (``fixed-<obligation>-<YYYYMMDD>``), never a row's integer."""
+    return f"fixed-{obligation_id}-{day:%Y%m%d}"
+
+
+def parse_occurrence_id(value: str) -> Optional[Tuple[int, date]]:
+    """``(obligation_id, date)`` of an :func:`occurrence_id`, or ``None`` if
+    ``value`` is not one."""
+    match = _OCCURRENCE_ID.fullmatch(value)
+    if match is None:
+        return None
+    try:
+        return int(match[1]), datetime.strptime(match[2], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def _as_date(value: date | datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def occurrence_dates(rule: Any, first: date, last: date) -> Iterator[date]:
+    """Dates in ``[first, last]`` on which ``rule`` recurs (per weekday, not sorted).
+
+    ``rule`` is a :class:`FixedObligation` or any row with its columns.
+    """
+    step = RECURRENCE_STEP_DAYS.get(rule.recurrence, 7)
+    begin = _as_date(rule.start_date)
+    if rule.end_date is not None:
+        last = min(last, _as_date(rule.end_date))
+    for day_name in rule.days_of_week or ():
+        weekday = WEEKDAYS.get(day_name)
+        if weekday is None:
+            continue
+        d = begin + timedelta(days=(weekday - begin.weekday()) % 7)
+        if d < first:
+            # Jump straight to the first occurrence inside the window
+            d += timedelta(days=-(-(first - d).days // step) * step)
+        while d <= last:
+            yield d
+            d += timedelta(days=step)
+
+
+def expand(
+    rule: Any, start: datetime, end: datetime, skip: Container[date] = (),
+) -> Iterator[Tuple[datetime, datetime, datetime]]:
+    """``(date, start, end)`` of every occurrence of ``rule`` overlapping
+    ``[start, end)``, leaving out the dates in ``skip``."""
+    for d in occurrence_dates(rule, start.date(), end.date()):
+        if d in skip:
+            continue
+        s, e = datetime.combine(d, rule.start_time), datetime.combine(d, rule.end_time)
+        if s < end and e > start:
+            yield datetime.combine(d, time()), s, e
+
+
+def load_occurrences(
+    db: Session, student_ids: Iterable[int], start: datetime, end: datetime,
+) -> Dict[int, List[Occurrence]]:
+    """Occurrences of the students' fixed obligations overlapping
+    ``[start, end)`` that no stored row replaces – one query (rules outer
+    joined with their exception dates in the window)."""
+    student_ids = list(student_ids)
+    fo, ce = FixedObligation, CalendarEvent
+    window_first = datetime.combine(start.date(), time())
+    stmt = (
+        select(
+            fo.student_id, fo.obligation_id, fo.name, fo.course_id, fo.priority,
+            fo.days_of_week, fo.start_date, fo.end_date, fo.recurrence, fo.start_time, fo.end_time,
+            ce.date.label("exception_date"),
+        )
+        .outerjoin(ce, and_(ce.fixed_obligation_id == fo.obligation_id, ce.date >= window_first, ce.date < end))
+        .where(
+            fo.student_id.in_(student_ids),
+            fo.start_date <= end.date(),
+            or_(fo.end_date.is_(None), fo.end_date >= start.date()),
+        )
+    )
+    rules: Dict[int, Any] = {}
+    skip: Dict[int, set] = defaultdict(set)
+    for row in db.execute(stmt):
+        rules.setdefault(row.obligation_id, row)
+        if row.exception_date is not None:
+            skip[row.obligation_id].add(_as_date(row.exception_date))
+
+    out: Dict[int, List[Occurrence]] = {sid: [] for sid in student_ids}
+    for obligation_id, rule in rules.items():
+        out[rule.student_id].extend(
+            Occurrence(rule.student_id, obligation_id, rule.name, rule.course_id, rule.priority, d, s, e)
+            for d, s, e in expand(rule, start, end, skip[obligation_id])
+        )
+    return out
@@ -1,18 +1,41 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, HTTPException
 from typing import List
 
+from .cache import solve_cache
 from .schemas import GenerateRequest, UpdateRequest, CalendarEvent
-# from .service import generate_schedule
-from .service import update_schedule
+from .service import generate_schedule, regenerate_schedule
 
 
 router = APIRouter(prefix="/schedule", tags=["scheduler"])
 
-# @router.post("/generate", response_model=List[CalendarEvent])
-# async def generate_endpoint(req: GenerateRequest):
-#     return generate_schedule(req)
+# Stateless: the whole problem comes in the request and nothing touches the
+# database.  Plain ``def`` endpoints – FastAPI runs the CPU‑bound solve in its
+# thread pool instead of blocking the event loop.
+
+
+def _solve(fn, req, slot_minutes: int, night_mode: str) -> List[CalendarEvent]:
+    try:
+        return fn(req, slot_min=slot_minutes, night_mode=night_mode)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=f"No feasible schedule: {exc}")
+
+
+@router.post("/generate", response_model=List[CalendarEvent])
+def generate_endpoint(req: GenerateRequest, slot_minutes: int = 30, night_mode: str = "soft"):
+    """Plan every task of ``req`` from ``week_start`` on."""
+    return _solve(generate_schedule, req, slot_minutes, night_mode)
 
 
 @router.post("/update", response_model=List[CalendarEvent])
-async def update_endpoint(req: UpdateRequest):
-    return update_schedule(req)
+def update_endpoint(req: UpdateRequest, slot_minutes: int = 30, night_mode: str = "soft"):
+    """Re‑plan ``new_payload`` starting from ``old_events``: sessions stay
+    put where that is still optimal and keep their ids."""
+    return _solve(regenerate_schedule, req, slot_minutes, night_mode)
+
+
+@router.get("/cache")
+def cache_stats():
+    """Hit / miss counters of this process's solve cache (see :mod:`.cache`)."""
+    return solve_cache.stats()
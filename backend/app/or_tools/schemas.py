@@ -19,7 +19,7 @@ class FlexibleTask(BaseModel):
     deadline: datetime
     priority: int = 5
     dependencies: List[str] = []
-    max_per_day: Optional[int] = None  # future use
+    max_per_day: Optional[int] = None  # most sessions starting on one day
 
 
 class AcademicTask(FlexibleTask):
@@ -51,4 +51,13 @@ class CalendarEvent(BaseModel):
 
 class UpdateRequest(BaseModel):
     old_events: List[CalendarEvent]
-    new_payload: GenerateRequest
\ No newline at end of file
+    new_payload: GenerateRequest
+
+
+class BatchReplanRequest(BaseModel):
+    """Who to re‑plan: explicit ids, a course's students, or (neither) everyone."""
+    student_ids: Optional[List[int]] = None
+    course_id: Optional[int] = None
+    night_mode: str = "soft"
+    slot_minutes: int = 30
+    preset: str = "balanced"
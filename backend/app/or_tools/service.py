@@ -1,7 +1,7 @@
 from __future__ import annotations
 import logging
-from datetime import datetime, time, timedelta
-from typing import Dict, List
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -10,6 +10,8 @@ from app.models.schedule import FixedObligation, FlexibleObligation, CalendarEve
 from app.models.academic import AcademicTask
 from app.models.course import Course, StudentCourse
 
+from . import schemas
+from .optimizer import WEEKDAYS, SolvedSessions, _solve_with_or_tools
 from .optimizer import update_schedule as optimize_schedule
 
 from sqlalchemy.exc import SQLAlchemyError
@@ -129,6 +131,127 @@ def _to_datetime(week_start: datetime, t: str | time) -> datetime:
     return datetime.combine(week_start.date(), t)
 
 
+# ──────────────────────────────────────────────────────────────────────────
+# Stateless solve API – request payload in, calendar out, no database
+# ──────────────────────────────────────────────────────────────────────────
+
+PEAK_SLOT_WEIGHT = 1.0  # slot weight of a preferred hour; others keep the default
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    """The optimizer works on naive UTC datetimes."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _peak_slot_weights(prefs: Optional[schemas.Preferences]) -> Optional[Dict[str, float]]:
+    """``Preferences.peak_hours`` as a productivity profile (every weekday)."""
+    if not prefs or not prefs.peak_hours:
+        return None
+    return {f"{day}-{hour}": PEAK_SLOT_WEIGHT for day in WEEKDAYS for hour in prefs.peak_hours}
+
+
+def _payload_task(task: schemas.FlexibleTask, week_start: datetime, hints: List[datetime]) -> Dict:
+    return {
+        "id": task.id,
+        "total_hours": task.total_hours,
+        "session_hours": task.session_hours,
+        "start_date": week_start,
+        "end_date": _naive_utc(task.deadline),
+        "priority": task.priority,
+        "max_per_day": task.max_per_day,
+        "hints": hints,
+    }
+
+
+def _events_out(
+    req: schemas.GenerateRequest,
+    sessions: SolvedSessions,
+    kinds: Dict[str, str],
+    old_ids: Dict[str, List[str]],
+) -> List[schemas.CalendarEvent]:
+    """Fixed tasks plus the placed sessions (naive UTC), in start order.  A task's
+    sessions reuse its old event ids (``old_ids``) before new ones are minted."""
+    events = [
+        schemas.CalendarEvent(
+            id=f.id, start_time=_naive_utc(f.start), end_time=_naive_utc(f.end), type="fixed", parent_task_id=f.id,
+        )
+        for f in req.fixed_tasks
+    ]
+    placed: Dict[str, int] = {}
+    for i in sorted(range(len(sessions)), key=sessions.start.__getitem__):
+        task_id = sessions.task_key(i)
+        n = placed[task_id] = placed.get(task_id, 0) + 1
+        reuse = old_ids.get(task_id, [])
+        events.append(schemas.CalendarEvent(
+            id=reuse[n - 1] if n <= len(reuse) else f"{task_id}-{n}",
+            start_time=sessions.start_time(i),
+            end_time=sessions.end_time(i),
+            type=kinds[task_id],
+            parent_task_id=task_id,
+        ))
+    events.sort(key=lambda e: e.start_time)
+    return events
+
+
+def generate_schedule(
+    req: schemas.GenerateRequest,
+    *,
+    old_events: Optional[List[schemas.CalendarEvent]] = None,
+    slot_min: int = 30,
+    night_mode: str = "soft",
+    params: str = "fast",
+) -> List[schemas.CalendarEvent]:
+    """Solve ``req`` from ``week_start`` on – pure compute, nothing is read
+    from or written to the database, so this scales out like any stateless
+    service.
+
+    Fixed tasks block their time, flexible and academic tasks are cut into
+    ``session_hours`` sessions before their deadline.  ``preferences`` cap
+    the study hours per day, keep sessions ``min_gap_between_sessions``
+    hours apart and steer them towards ``peak_hours``.  Sessions
+    in ``old_events`` (by ``parent_task_id``) warm‑start their task and hand
+    their ids on.  Raises ``ValueError`` for bad settings and ``RuntimeError``
+    when no schedule fits.
+    """
+    week_start = _naive_utc(req.week_start)
+    old_starts: Dict[str, List[datetime]] = {}
+    old_ids: Dict[str, List[str]] = {}
+    for e in sorted(old_events or [], key=lambda e: e.start_time):
+        if e.parent_task_id and e.type != "fixed":
+            old_starts.setdefault(e.parent_task_id, []).append(_naive_utc(e.start_time))
+            old_ids.setdefault(e.parent_task_id, []).append(e.id)
+
+    fixed = [{"start": _naive_utc(f.start), "end": _naive_utc(f.end)} for f in req.fixed_tasks]
+    kinds = {t.id: "flexible" for t in req.flexible_tasks}
+    kinds.update({t.id: "academic" for t in req.academic_tasks})
+    if len(kinds) < len(req.flexible_tasks) + len(req.academic_tasks):
+        raise ValueError("Task ids must be unique across flexible and academic tasks")
+    tasks = [
+        _payload_task(t, week_start, old_starts.get(t.id, []))
+        for t in req.flexible_tasks + req.academic_tasks
+    ]
+    if not tasks:
+        return _events_out(req, SolvedSessions(), kinds, old_ids)
+
+    prefs = req.preferences
+    sessions, _ = _solve_with_or_tools(
+        fixed, tasks,
+        night_mode=night_mode, slot_min=slot_min, now=week_start, params=params,
+        slot_weights=_peak_slot_weights(prefs),
+        max_day_hours=prefs.max_hours_per_day if prefs else None,
+        min_gap_hours=prefs.min_gap_between_sessions if prefs else 0,
+    )
+    return _events_out(req, sessions, kinds, old_ids)
+
+
+def regenerate_schedule(req: schemas.UpdateRequest, **kwargs) -> List[schemas.CalendarEvent]:
+    """:func:`generate_schedule` for ``new_payload``, keeping what it can of
+    ``old_events`` (same slots where still optimal, same ids)."""
+    return generate_schedule(req.new_payload, old_events=req.old_events, **kwargs)
+
+
 # ──────────────────────────────────────────────────────────────────────────
 # Main update function
 # ──────────────────────────────────────────────────────────────────────────
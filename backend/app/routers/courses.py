@@ -7,7 +7,7 @@ from app.database import get_db
 from app.models.student import Student
 from app.models.course import Course, StudentCourse
 from app.auth.token import get_current_student
-from app.routers.tasks import create_fixed_obligation, FixedObligationCreate, delete_fixed_obligation, create_calendar_events_from_fixed
+from app.routers.tasks import create_fixed_obligation, FixedObligationCreate, delete_fixed_obligation
 import datetime
 from app.or_tools.service import update_schedule  # Import the update_schedule function
 from app.models.schedule import FixedObligation
@@ -160,11 +160,10 @@ async def register_course(
                 course_id=course.course_id,
             )
     
+            # Lectures are expanded from this rule when the calendar is read - no event rows
             db.add(new_obligation)
             db.commit()
             db.refresh(new_obligation)
-
-            create_calendar_events_from_fixed(new_obligation, current_student, db)
         #TODO:
         # Call update_schedule to optimize the calendar
         # Temporarily disabled
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel
 from datetime import time, date  # Add 'date' to your imports
 from app.database import get_db
@@ -11,10 +12,44 @@ from datetime import datetime, timedelta
 from app.models.academic import AcademicTask
 from app.models.course import Course, StudentCourse
 import logging
-from app.or_tools.optimizer import update_schedule  # Import the update_schedule function
+from collections import Counter
+from app.or_tools.optimizer import SLOT_MINUTES, SOLVER_PRESETS
+from app.or_tools.jobs import enqueue_reschedule, get_job, wait_for_job
+from app.or_tools.availability import availability_index
+from app.or_tools.recurrence import (
+    CANCELLED, Occurrence, load_occurrences, occurrence_dates, occurrence_id, parse_occurrence_id,
+)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+def validate_slot_minutes(slot_minutes: int) -> None:
+    if slot_minutes not in SLOT_MINUTES:
+        raise HTTPException(status_code=400, detail=f"slot_minutes must be one of {list(SLOT_MINUTES)}")
+
+# How long a ?wait=true write holds the response for its solve (the "fast"
+# time limit plus room for loading and write‑back)
+INTERACTIVE_WAIT_S = SOLVER_PRESETS["fast"].time_limit_s + 3
+
+async def reschedule(student_id: int, changed_obligation_ids: List[int], slot_minutes: int, wait: bool) -> Dict[str, Any]:
+    """Queue the re‑optimisation for a write.
+
+    ``wait`` means a user is looking at the calendar: skip the debounce, use
+    the "fast" preset and return the finished job.  Otherwise the job runs in
+    the background with the "balanced" budget.
+    """
+    if not wait:
+        job = enqueue_reschedule(student_id, changed_obligation_ids=changed_obligation_ids, slot_min=slot_minutes)
+        return job.to_dict()
+    job = enqueue_reschedule(
+        student_id,
+        changed_obligation_ids=changed_obligation_ids,
+        slot_min=slot_minutes,
+        preset="fast",
+        debounce_s=0,
+    )
+    job = await wait_for_job(job, INTERACTIVE_WAIT_S)
+    return job.to_dict()
+
 # ---- Fixed Obligations ----
 
 class FixedObligationCreate(BaseModel):
@@ -58,127 +93,6 @@ class CalendarEventUpdate(BaseModel):
     priority: Optional[int] = None
     status: Optional[str] = None
 
-def create_calendar_events_from_fixed(
-        fixed_obligation: FixedObligation,
-        current_student: Student,
-        db: Session,
-):
-    try:
-        logging.info("HIIIIIIIIIIIIIIIIIIIIIII")
-        today = datetime.now()
-        days_of_week = {
-            "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, 
-            "Friday": 4, "Saturday": 5, "Sunday": 6
-        }
-        
-        # Create events for each day in days_of_week
-        for day_name in fixed_obligation.days_of_week:
-            # Get the weekday index (0-6) for this day name
-            target_day = days_of_week.get(day_name)
-            if target_day is None:
-                logging.warning(f"Invalid day of week: {day_name}")
-                continue
-            
-            # Determine the base date to start calculating events from
-            base_date = fixed_obligation.start_date if fixed_obligation.start_date else today.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Find the first occurrence of this weekday on or after the base date
-            if base_date.weekday() == target_day:
-                    first_occurrence = base_date
-            else:
-                days_until_target = (target_day - base_date.weekday() + 7) % 7
-                first_occurrence = base_date + timedelta(days=days_until_target)
-            
-            # Monthly recurrence pattern
-            if fixed_obligation.recurrence == "monthly":
-                current_date = first_occurrence
-                for i in range(6):  # 6 months ahead
-                    # Skip if beyond end_date
-                    if fixed_obligation.end_date:
-                        # Check if we're comparing date to datetime, and handle accordingly
-                        end_date_to_compare = fixed_obligation.end_date
-                        current_date_to_compare = current_date
-                        
-                        if isinstance(end_date_to_compare, datetime) and isinstance(current_date_to_compare, date):
-                            current_date_to_compare = datetime.combine(current_date_to_compare, datetime.min.time())
-                        elif isinstance(end_date_to_compare, date) and isinstance(current_date_to_compare, datetime):
-                            current_date_to_compare = current_date_to_compare.date()
-                        
-                        if current_date_to_compare > end_date_to_compare:
-                            break
-                        
-                    # Create the calendar event
-                    if isinstance(current_date, date) and not isinstance(current_date, datetime):
-                        start_datetime = datetime.combine(current_date, fixed_obligation.start_time)
-                        end_datetime = datetime.combine(current_date, fixed_obligation.end_time)
-                    else:
-                        start_datetime = current_date.replace(hour=fixed_obligation.start_time.hour, minute=fixed_obligation.start_time.minute)
-                        end_datetime = current_date.replace(hour=fixed_obligation.end_time.hour, minute=fixed_obligation.end_time.minute)
-                    
-                    calendar_event = CalendarEvent(
-                        student_id=current_student.student_id,
-                        event_type="fixed_obligation",
-                        fixed_obligation_id=fixed_obligation.obligation_id,
-                        date=current_date,
-                        start_time=start_datetime,
-                        end_time=end_datetime,
-                        priority=fixed_obligation.priority,
-                        status="scheduled"
-                    )
-                    db.add(calendar_event)
-                    
-                    # Move to next month (roughly)
-                    current_date = current_date + timedelta(days=30)
-            else:
-                # Weekly or biweekly recurrence
-                weeks_ahead = 26  # About 6 months
-                interval = 2 if fixed_obligation.recurrence == "biweekly" else 1
-                
-                # Create events for each weekly occurrence
-                for i in range(0, weeks_ahead, interval):
-                    current_date = first_occurrence + timedelta(days=i*7)
-                    
-                    # Skip if beyond end_date
-                    if fixed_obligation.end_date:
-                        # Check if we're comparing date to datetime, and handle accordingly
-                        end_date_to_compare = fixed_obligation.end_date
-                        current_date_to_compare = current_date
-                        
-                        if isinstance(end_date_to_compare, datetime) and isinstance(current_date_to_compare, date):
-                            current_date_to_compare = datetime.combine(current_date_to_compare, datetime.min.time())
-                        elif isinstance(end_date_to_compare, date) and isinstance(current_date_to_compare, datetime):
-                            current_date_to_compare = current_date_to_compare.date()
-                            
-                        if current_date_to_compare > end_date_to_compare:
-                            break
-                        
-                    # Create the calendar event
-                    if isinstance(current_date, date) and not isinstance(current_date, datetime):
-                        start_datetime = datetime.combine(current_date, fixed_obligation.start_time)
-                        end_datetime = datetime.combine(current_date, fixed_obligation.end_time)
-                    else:
-                        start_datetime = current_date.replace(hour=fixed_obligation.start_time.hour, minute=fixed_obligation.start_time.minute)
-                        end_datetime = current_date.replace(hour=fixed_obligation.end_time.hour, minute=fixed_obligation.end_time.minute)
-                    
-                    calendar_event = CalendarEvent(
-                        student_id=current_student.student_id,
-                        event_type="fixed_obligation",
-                        fixed_obligation_id=fixed_obligation.obligation_id,
-                        date=current_date,
-                        start_time=start_datetime,
-                        end_time=end_datetime,
-                        priority=fixed_obligation.priority,
-                        status="scheduled"
-                    )
-                    db.add(calendar_event)
-        
-        logging.info(f"Created calendar events for fixed obligation ID: {fixed_obligation.obligation_id}")    
-        db.commit()
-    except Exception as e:
-        logging.error(f"Failed to create calendar events: {str(e)}")
-        # The obligation was already created successfully, so we don't want to fail the whole request
-    
-
 @router.get("/fixed", operation_id="get_fixed_obligations")
 async def get_fixed_obligations(
     current_student: Student = Depends(get_current_student),
@@ -195,16 +109,19 @@ async def get_fixed_obligations(
 @router.post("/fixed", operation_id="create_fixed_obligation")
 async def create_fixed_obligation(
     obligation: FixedObligationCreate,
+    slot_minutes: int = 30,
+    wait: bool = False,
     current_student: Student = Depends(get_current_student),
     db: Session = Depends(get_db)
 ):
-    """Create a new fixed obligation for the current student
-        + add events to calendar
+    """Create a new fixed obligation for the current student.
+    Its occurrences are expanded from the recurrence rule when the calendar is read - no event rows are written.
     """
 
     # Validate priority
     if obligation.priority and (obligation.priority < 1 or obligation.priority > 5):
         raise HTTPException(status_code=400, detail="Priority must be between 1 and 5")
+    validate_slot_minutes(slot_minutes)
     
     # Validate days_of_week entries
     valid_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -230,29 +147,14 @@ async def create_fixed_obligation(
     db.commit()
     db.refresh(new_obligation)
 
-    logging.info("HIIIIIIIIIIIIIIIIIIIIIII")
-    create_calendar_events_from_fixed(new_obligation, current_student, db)
-    # Create calendar events corresponding to the fixed obligation
-     # ── OR-Tools re-optimisation ───────────────────────────────────────────
-    try:
-        # Pass the start_date to ensure the optimizer respects it
-        optimization_payload = {
-            "student_id": current_student.student_id
-        }
-        
-        # If a future start date is specified, include it in the payload
-        if obligation.start_date and obligation.start_date > datetime.now():
-            optimization_payload["week_start"] = obligation.start_date
-            
-        updated_events = update_schedule(db, student_id=current_student.student_id)
-    except Exception as e:
-        logging.error("Error updating schedule: %s", e)
-        raise HTTPException(500, "Error updating schedule")
+     # ── OR-Tools re-optimisation (background job) ─────────────────────────
+    # Only sessions clashing with the new fixed events need to move
+    schedule_job = await reschedule(current_student.student_id, [], slot_minutes, wait)
 
     return {
         "message": "Fixed obligation created successfully",
         "fixed_obligation_id": new_obligation.obligation_id,
-        "updated_events": updated_events,
+        "schedule_job": schedule_job,
     }
 
 
@@ -277,11 +179,13 @@ async def get_fixed_obligation(
 async def update_fixed_obligation(
     obligation_id: int,
     obligation_update: FixedObligationUpdate,
+    slot_minutes: int = 30,
+    wait: bool = False,
     current_student: Student = Depends(get_current_student),
     db: Session = Depends(get_db)
 ):
     """Update an existing fixed obligation
-        + edit events in calendar
+        + drop the future exceptions (moved / cancelled occurrences) and re-optimise if the schedule changed
     """
     # Check if obligation exists and belongs to the student
     db_obligation = db.query(FixedObligation).filter(
@@ -295,6 +199,7 @@ async def update_fixed_obligation(
     # Validate priority if provided
     if obligation_update.priority and (obligation_update.priority < 1 or obligation_update.priority > 5):
         raise HTTPException(status_code=400, detail="Priority must be between 1 and 5")
+    validate_slot_minutes(slot_minutes)
     
     # Check if we're updating schedule-related fields
     schedule_updated = any(field in obligation_update.dict(exclude_unset=True) 
@@ -308,25 +213,31 @@ async def update_fixed_obligation(
     db.commit()
     db.refresh(db_obligation)
     
-    # If schedule-related fields were updated, regenerate the calendar events
+    # If schedule-related fields were updated, the future occurrences follow the new rule -
+    # exceptions stored for the old one no longer apply
     if schedule_updated:
         try:
-            # Delete all future calendar events for this obligation
             future_events = db.query(CalendarEvent).filter(
                 CalendarEvent.fixed_obligation_id == obligation_id,
-                CalendarEvent.start_time >= datetime.now()
+                CalendarEvent.date >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             ).all()
             
             for event in future_events:
                 db.delete(event)
             db.commit()
-            
-            create_calendar_events_from_fixed(db_obligation, current_student, db)
         except Exception as e:
             logging.error(f"Failed to update calendar events: {str(e)}")
             # The obligation was already updated successfully, so we don't want to fail the whole request
+
+        # ── OR-Tools re-optimisation (background job) ─────────────────────
+        # Only sessions clashing with the new occurrences need to move
+        schedule_job = await reschedule(current_student.student_id, [], slot_minutes, wait)
+        return {
+            "message": "Fixed obligation updated successfully",
+            "fixed_obligation_id": obligation_id,
+            "schedule_job": schedule_job,
+        }
     
-    #TODO: function call to or tools
     return db_obligation
 
 @router.delete("/fixed/{obligation_id}", operation_id="delete_fixed_obligation")
@@ -348,7 +259,7 @@ async def delete_fixed_obligation(
     
     # Delete associated calendar events
     try:        
-        # Find and delete all calendar events associated with this obligation
+        # Find and delete all calendar events (exceptions or older materialised occurrences) of this obligation
         calendar_events = db.query(CalendarEvent).filter(
             CalendarEvent.fixed_obligation_id == obligation_id
         ).all()
@@ -366,6 +277,79 @@ async def delete_fixed_obligation(
     
     return {"message": "Fixed obligation deleted successfully"}
 
+class OccurrenceMove(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+def _occurrence_exception(obligation_id: int, occurrence_date: date, current_student: Student, db: Session) -> CalendarEvent:
+    """The exception row of one occurrence of a fixed obligation - loaded, or created from the rule"""
+    db_obligation = db.query(FixedObligation).filter(
+        FixedObligation.obligation_id == obligation_id,
+        FixedObligation.student_id == current_student.student_id
+    ).first()
+    if not db_obligation:
+        raise HTTPException(status_code=404, detail="Fixed obligation not found or not owned by this student")
+    if occurrence_date not in set(occurrence_dates(db_obligation, occurrence_date, occurrence_date)):
+        raise HTTPException(status_code=404, detail=f"Fixed obligation does not occur on {occurrence_date}")
+
+    day = datetime.combine(occurrence_date, time())
+    db_event = db.query(CalendarEvent).filter(
+        CalendarEvent.fixed_obligation_id == obligation_id,
+        CalendarEvent.date == day
+    ).first()
+    if db_event is None:
+        db_event = CalendarEvent(
+            student_id=current_student.student_id,
+            event_type="fixed_obligation",
+            fixed_obligation_id=obligation_id,
+            course_id=db_obligation.course_id,
+            date=day,
+            start_time=datetime.combine(occurrence_date, db_obligation.start_time),
+            end_time=datetime.combine(occurrence_date, db_obligation.end_time),
+            priority=db_obligation.priority,
+        )
+        db.add(db_event)
+    return db_event
+
+@router.put("/fixed/{obligation_id}/occurrences/{occurrence_date}", operation_id="move_fixed_occurrence")
+async def move_fixed_occurrence(
+    obligation_id: int,
+    occurrence_date: date,
+    move: OccurrenceMove,
+    slot_minutes: int = 30,
+    wait: bool = False,
+    current_student: Student = Depends(get_current_student),
+    db: Session = Depends(get_db)
+):
+    """Move one occurrence of a fixed obligation - stored as an exception to its recurrence rule"""
+    if move.start_time >= move.end_time:
+        raise HTTPException(status_code=400, detail="Start time must be before end time")
+    validate_slot_minutes(slot_minutes)
+
+    db_event = _occurrence_exception(obligation_id, occurrence_date, current_student, db)
+    db_event.start_time = move.start_time
+    db_event.end_time = move.end_time
+    db_event.status = "scheduled"
+    db.commit()
+    db.refresh(db_event)
+
+    # Sessions the moved occurrence now lands on have to move
+    schedule_job = await reschedule(current_student.student_id, [], slot_minutes, wait)
+    return {"event": db_event, "schedule_job": schedule_job}
+
+@router.delete("/fixed/{obligation_id}/occurrences/{occurrence_date}", operation_id="cancel_fixed_occurrence")
+async def cancel_fixed_occurrence(
+    obligation_id: int,
+    occurrence_date: date,
+    current_student: Student = Depends(get_current_student),
+    db: Session = Depends(get_db)
+):
+    """Cancel one occurrence of a fixed obligation - stored as an exception to its recurrence rule"""
+    db_event = _occurrence_exception(obligation_id, occurrence_date, current_student, db)
+    db_event.status = CANCELLED
+    db.commit()
+    return {"message": f"Occurrence on {occurrence_date} cancelled"}
+
 # ---- Flexible Obligations ----
 
 class FlexibleObligationCreate(BaseModel):
@@ -418,6 +402,8 @@ async def get_flexible_obligation(
 @router.post("/flexible", operation_id="create_flexible_obligation")
 async def create_flexible_obligation(
     obligation: FlexibleObligationCreate,
+    slot_minutes: int = 30,
+    wait: bool = False,
     current_student: Student = Depends(get_current_student),
     db: Session = Depends(get_db),
 ):
@@ -430,6 +416,7 @@ async def create_flexible_obligation(
     # Validate weekly target hours
     if obligation.weekly_target_hours <= 0:
         raise HTTPException(400, "Weekly target hours must be positive")
+    validate_slot_minutes(slot_minutes)
         
     # Make sure start_date is not None
     if obligation.start_date is None:
@@ -471,42 +458,22 @@ async def create_flexible_obligation(
     else:
         print("WARNING: Couldn't verify created obligation")
 
-    # ── OR-Tools re-optimisation with start_date ────────────────────────
-    try:
-        # Pass the start_date to ensure the optimizer respects it
-        optimization_payload = {
-            "student_id": current_student.student_id,
-            "newly_created_obligation_id": new_obligation.obligation_id
-        }
-        
-        # If a future start date is specified, include it in the payload
-        # Make sure we convert datetime to string for JSON serialization if needed
-        if obligation.start_date and obligation.start_date > datetime.now():
-            # Convert datetime to string in ISO format if needed for JSON serialization
-            if hasattr(obligation.start_date, 'isoformat'):
-                optimization_payload["week_start"] = obligation.start_date
-            else:
-                # Already a string or other format
-                optimization_payload["week_start"] = obligation.start_date
-            
-        print(f"Calling update_schedule with payload: {optimization_payload}")
-        updated_events = update_schedule(db, student_id=current_student.student_id)
-        if updated_events is not None:
-            print(f"update_schedule returned {len(updated_events)} events")
-    except Exception as e:
-        logging.error("Error updating schedule: %s", e)
-        import traceback
-        error_details = traceback.format_exc()
-        logging.error(f"Flexible obligation schedule error: {error_details}")
-        raise HTTPException(500, f"Error updating schedule: {str(e)}")
+    # ── OR-Tools re-optimisation (background job) ───────────────────────
+    schedule_job = await reschedule(current_student.student_id, [new_obligation.obligation_id], slot_minutes, wait)
 
-    
+    return {
+        "message": "Flexible obligation created successfully",
+        "flexible_obligation_id": new_obligation.obligation_id,
+        "schedule_job": schedule_job,
+    }
 
 
 @router.put("/flexible/{obligation_id}", operation_id="update_flexible_obligation")
 async def update_flexible_obligation(
     obligation_id: int,
     obligation_update: FlexibleObligationUpdate,
+    slot_minutes: int = 30,
+    wait: bool = False,
     current_student: Student = Depends(get_current_student),
     db: Session = Depends(get_db)
 ):
@@ -523,6 +490,7 @@ async def update_flexible_obligation(
     # Validate priority if provided
     if obligation_update.priority and (obligation_update.priority < 1 or obligation_update.priority > 5):
         raise HTTPException(status_code=400, detail="Priority must be between 1 and 5")
+    validate_slot_minutes(slot_minutes)
     
     # Check if we're updating schedule-related fields
     schedule_updated = any(field in obligation_update.dict(exclude_unset=True) 
@@ -536,36 +504,14 @@ async def update_flexible_obligation(
     db.commit()
     db.refresh(db_obligation)
     
-    # TODO: function call to or tools
     # If schedule-related fields were updated, trigger a re-optimization
     if schedule_updated:
-        try:
-            # Pass the obligation_id to ensure the optimizer respects it
-            optimization_payload = {
-                "student_id": current_student.student_id,
-                "newly_created_obligation_id": obligation_id
-            }
-            
-            # If a future start date is specified, include it in the payload
-            if db_obligation.start_date and db_obligation.start_date > datetime.now():
-                optimization_payload["week_start"] = db_obligation.start_date
-                
-            print(f"Calling update_schedule with payload: {optimization_payload}")
-            updated_events = update_schedule(db, student_id=current_student.student_id)
-            if updated_events is not None:
-                print(f"update_schedule returned {len(updated_events)} events")
-            
-            return {
-                "message": "Flexible obligation updated successfully",
-                "flexible_obligation_id": obligation_id,
-                "updated_events": updated_events
-            }
-        except Exception as e:
-            logging.error("Error updating schedule: %s", e)
-            import traceback
-            error_details = traceback.format_exc()
-            logging.error(f"Flexible obligation schedule error: {error_details}")
-            # Don't fail the whole request, just return the updated obligation without events
+        schedule_job = await reschedule(current_student.student_id, [obligation_id], slot_minutes, wait)
+        return {
+            "message": "Flexible obligation updated successfully",
+            "flexible_obligation_id": obligation_id,
+            "schedule_job": schedule_job,
+        }
     
     return db_obligation
 
@@ -602,6 +548,19 @@ async def delete_flexible_obligation(
     
     return {"message": "Flexible obligation deleted successfully"}
 
+# ---- Schedule Jobs ----
+
+@router.get("/schedule-jobs/{job_id}", operation_id="get_schedule_job")
+async def get_schedule_job(
+    job_id: str,
+    current_student: Student = Depends(get_current_student),
+):
+    """Status of a background re-optimisation job (queued / running / done / failed)"""
+    job = get_job(job_id)
+    if not job or job.student_id != current_student.student_id:
+        raise HTTPException(status_code=404, detail="Schedule job not found or not owned by this student")
+    return job.to_dict()
+
 # ---- Academic Tasks ----
 
 @router.get("/academic-tasks", operation_id="get_academic_tasks")
@@ -788,6 +747,73 @@ async def update_academic_task(
     return db_task
 
 # ---- Calendar Events ----
+def occurrence_event(o: Occurrence) -> Dict[str, Any]:
+    """An occurrence expanded from a fixed obligation's rule in the shape of a calendar event row, keyed
+    by its string occurrence_id."""
+    return dict(
+        dict.fromkeys(c.name for c in CalendarEvent.__table__.columns),
+        event_id=occurrence_id(o.obligation_id, o.date),
+        student_id=o.student_id,
+        event_type="fixed_obligation",
+        fixed_obligation_id=o.obligation_id,
+        course_id=o.course_id,
+        date=o.date,
+        start_time=o.start_time,
+        end_time=o.end_time,
+        priority=o.priority,
+        status="scheduled",
+        name=o.name,
+        obligation_type="fixed",
+    )
+
+def calendar_events_with_names(db: Session, student_id: int, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """
+    Calendar events of a student overlapping [start_date, end_date), ordered by start time, each with
+    the name and type ('fixed' / 'flexible') of its obligation. Two queries: stored events with their
+    obligations outer joined, then the occurrences of recurring fixed obligations, whose event_id is
+    the string occurrence_id ("fixed-<obligation>-<YYYYMMDD>") so clients can still key them.
+    """
+    events = CalendarEvent.__table__
+    stmt = (
+        select(
+            events,
+            FixedObligation.name.label("fixed_name"),
+            FlexibleObligation.obligation_id.label("flexible_found"),
+            FlexibleObligation.name.label("flexible_name"),
+            FlexibleObligation.description.label("flexible_description"),
+        )
+        .outerjoin(FixedObligation, FixedObligation.obligation_id == events.c.fixed_obligation_id)
+        .outerjoin(FlexibleObligation, FlexibleObligation.obligation_id == events.c.flexible_obligation_id)
+        .where(
+            events.c.student_id == student_id,
+            events.c.start_time < end_date,  # Event starts before the window ends
+            events.c.end_time > start_date,  # Event ends after the window starts
+        )
+        .order_by(events.c.start_time)
+    )
+    columns = [c.name for c in events.columns]
+    events_with_names = []
+    for row in db.execute(stmt):
+        event_dict = dict(zip(columns, row))
+        if event_dict["fixed_obligation_id"] and event_dict["status"] == CANCELLED:
+            continue  # a cancelled occurrence only hides the rule's one
+        obligation_name = obligation_type = None
+        if event_dict["fixed_obligation_id"]:
+            if row.fixed_name is not None:
+                obligation_name, obligation_type = row.fixed_name, "fixed"
+        elif event_dict["flexible_obligation_id"] and row.flexible_found is not None:
+            # Use name if available, otherwise fallback to description
+            obligation_name, obligation_type = row.flexible_name or row.flexible_description, "flexible"
+        event_dict["name"] = obligation_name
+        event_dict["obligation_type"] = obligation_type  # 'fixed' or 'flexible'
+        events_with_names.append(event_dict)
+
+    occurrences = load_occurrences(db, [student_id], start_date, end_date)[student_id]
+    if occurrences:
+        events_with_names.extend(occurrence_event(o) for o in occurrences)
+        events_with_names.sort(key=lambda e: e["start_time"])
+    return events_with_names
+
 @router.get("/calendar-events", operation_id="get_calendar_events")
 async def get_calendar_events(
     current_student: Student = Depends(get_current_student),
@@ -812,63 +838,39 @@ async def get_calendar_events(
     if start_date >= end_date:
         raise HTTPException(status_code=400, detail="Start date must be before end date")
 
-    # Fetch calendar events for the current student within the date range
-    # Query events that overlap with the requested time window
-    events = db.query(CalendarEvent).filter(
-        CalendarEvent.student_id == current_student.student_id,
-        CalendarEvent.start_time < end_date,  # Event starts before the window ends
-        CalendarEvent.end_time > start_date   # Event ends after the window starts
-    ).order_by(CalendarEvent.start_time).all()
+    events_with_names = calendar_events_with_names(db, current_student.student_id, start_date, end_date)
 
-    events_with_names = []
-    event_types_count = {} # Renamed from event_types to avoid conflict
-
-    for event in events:
-        obligation_name = None
-        obligation_type = None # To store 'fixed' or 'flexible'
-
-        # Check for fixed obligation
-        if event.fixed_obligation_id:
-            fixed_obligation = db.query(FixedObligation).filter(
-                FixedObligation.obligation_id == event.fixed_obligation_id
-            ).first()
-            if fixed_obligation:
-                obligation_name = fixed_obligation.name
-                obligation_type = "fixed"
-
-        # Check for flexible obligation if fixed not found or not applicable
-        elif event.flexible_obligation_id:
-            flexible_obligation = db.query(FlexibleObligation).filter(
-                FlexibleObligation.obligation_id == event.flexible_obligation_id
-            ).first()
-            if flexible_obligation:
-                # Use name if available, otherwise fallback to description
-                obligation_name = flexible_obligation.name or flexible_obligation.description
-                obligation_type = "flexible"
-
-        # Convert event to dict and add obligation name and type
-        event_dict = {c.name: getattr(event, c.name) for c in event.__table__.columns}
-        event_dict["name"] = obligation_name
-        event_dict["obligation_type"] = obligation_type # Add the type ('fixed' or 'flexible')
-        events_with_names.append(event_dict)
-
-        # Log event types count
-        event_type_key = event.event_type
-        if event_type_key not in event_types_count:
-            event_types_count[event_type_key] = 0
-        event_types_count[event_type_key] += 1
-
-    print(f"Found {len(events)} calendar events: {event_types_count}")
+    # Log event types count
+    event_types_count = Counter(e["event_type"] for e in events_with_names)
+    print(f"Found {len(events_with_names)} calendar events: {dict(event_types_count)}")
 
     return events_with_names
 
 @router.get("/calendar-events/{event_id}", operation_id="get_calendar_event")
 async def get_calendar_event(
-    event_id: int,
+    event_id: Union[int, str],
     current_student: Student = Depends(get_current_student),
     db: Session = Depends(get_db)
 ):
-    """Get a specific calendar event by ID"""
+    """
+    Get a specific calendar event by ID - a stored row's integer id, or the occurrence_id
+    ("fixed-<obligation>-<YYYYMMDD>") the calendar listing gives occurrences expanded from a rule.
+    """
+    # A path segment always validates as str; digits are a row's id
+    if isinstance(event_id, str) and event_id.isdigit():
+        event_id = int(event_id)
+    if isinstance(event_id, str):
+        parsed = parse_occurrence_id(event_id)
+        if parsed is None:
+            raise HTTPException(status_code=404, detail="Calendar event not found or not owned by this student")
+        obligation_id, day = parsed
+        day_start = datetime.combine(day, time())
+        occurrences = load_occurrences(db, [current_student.student_id], day_start, day_start + timedelta(days=1))
+        for o in occurrences[current_student.student_id]:
+            if o.obligation_id == obligation_id and o.date == day_start:
+                return occurrence_event(o)
+        raise HTTPException(status_code=404, detail="Calendar event not found or not owned by this student")
+
     db_event = db.query(CalendarEvent).filter(
         CalendarEvent.event_id == event_id,
         CalendarEvent.student_id == current_student.student_id
@@ -877,4 +879,46 @@ async def get_calendar_event(
     if not db_event:
         raise HTTPException(status_code=404, detail="Calendar event not found or not owned by this student")
     
-    return db_event
\ No newline at end of file
+    return db_event
+
+# ---- Free Time ----
+
+@router.get("/free-time", operation_id="get_free_time")
+async def get_free_time(
+    current_student: Student = Depends(get_current_student),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_minutes: int = 0,
+    db: Session = Depends(get_db)
+):
+    """
+    Free windows of the current student between start date and end date (default: the next 7 days),
+    optionally only those at least min_minutes long. Answered from the in-memory availability index.
+    """
+    if start_date is None:
+        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if end_date is None:
+        end_date = start_date + timedelta(days=7)
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    if min_minutes < 0:
+        raise HTTPException(status_code=400, detail="min_minutes must not be negative")
+
+    occupancy = availability_index.get(db, current_student.student_id)
+    return [
+        {"start_time": start, "end_time": end, "minutes": int((end - start).total_seconds() // 60)}
+        for start, end in occupancy.free_windows(start_date, end_date, min_minutes)
+    ]
+
+@router.get("/can-fit", operation_id="can_fit")
+async def can_fit(
+    start_time: datetime,
+    end_time: datetime,
+    current_student: Student = Depends(get_current_student),
+    db: Session = Depends(get_db)
+):
+    """Whether [start_time, end_time) is free in the current student's calendar"""
+    if start_time >= end_time:
+        raise HTTPException(status_code=400, detail="Start time must be before end time")
+    occupancy = availability_index.get(db, current_student.student_id)
+    return {"start_time": start_time, "end_time": end_time, "free": occupancy.is_free(start_time, end_time)}
@@ -0,0 +1,50 @@
+"""Synthetic student calendars in the optimizer's dict format."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# (weekday set, start hour, start minute, duration in minutes) – a typical timetable
+_LECTURES = [
+    ({0, 2, 4}, 9, 0, 50),
+    ({0, 2, 4}, 11, 0, 50),
+    ({1, 3}, 12, 30, 75),
+    ({1, 3}, 15, 30, 75),
+    ({2}, 14, 0, 170),
+]
+
+
+def student_calendar(
+    weeks: int = 16,
+    n_tasks: int = 30,
+    *,
+    seed: int = 0,
+    start: datetime | None = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Return ``(fixed_events, flex_tasks)`` for a ``weeks``‑long semester."""
+    rng = random.Random(seed)
+    day0 = (start or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    fixed = []
+    for d in range(weeks * 7):
+        day = day0 + timedelta(days=d)
+        for weekdays, hour, minute, minutes in _LECTURES:
+            if day.weekday() in weekdays:
+                s = day.replace(hour=hour, minute=minute)
+                fixed.append({"date": day, "start": s, "end": s + timedelta(minutes=minutes)})
+
+    tasks = []
+    for i in range(n_tasks):
+        first = rng.randrange(0, max(1, weeks * 7 - 7))
+        length = rng.randint(7, min(28, weeks * 7 - first))
+        session_hours = rng.choice([1, 1, 1.5, 2])
+        tasks.append({
+            "id": i + 1,
+            "total_hours": session_hours * rng.randint(2, 6),
+            "session_hours": session_hours,
+            "start_date": day0 + timedelta(days=first),
+            "end_date": day0 + timedelta(days=first + length),
+            "priority": rng.randint(1, 5),
+        })
+    return fixed, tasks
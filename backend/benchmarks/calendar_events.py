@@ -0,0 +1,122 @@
+"""Reading a student's calendar with obligation names (``GET /tasks/calendar-events``).
+
+Run from ``backend/`` against PostgreSQL (``fixed_obligations.days_of_week``
+is an ARRAY column, which SQLite cannot create)::
+
+    DATABASE_URL=postgresql://… python -m benchmarks.calendar_events [--weeks 16] [--repeat 50]
+
+Seeds one student with a recurring timetable and flexible sessions inside a
+transaction that is rolled back at the end, then reads a 1‑week and a
+16‑week window both ways: the per‑event lookup the endpoint used to do (one
+query per event for its obligation) and :func:`calendar_events_with_names`
+(one query, obligations outer joined).  Reports statements per read and the
+p50 / p95 latency over ``--repeat`` reads.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import event
+
+from app.database import Base, SessionLocal, engine
+from app.models.schedule import CalendarEvent, FixedObligation, FlexibleObligation
+from app.models.student import Student
+from app.routers.tasks import calendar_events_with_names
+
+TABLES = [m.__table__ for m in (Student, FixedObligation, FlexibleObligation, CalendarEvent)]
+STUDENT_ID = 987_654  # out of the way of real rows – everything is rolled back anyway
+
+
+def _seed(db, weeks: int, start: datetime) -> None:
+    db.add(Student(student_id=STUDENT_ID, name="bench", email="calendar-bench@example.com"))
+    lectures = [
+        FixedObligation(
+            student_id=STUDENT_ID, name=f"Lecture {k}", start_time=dtime(9 + 2 * k), end_time=dtime(10 + 2 * k),
+            days_of_week=["Monday", "Wednesday", "Friday"], start_date=start.date(), recurrence="weekly",
+        )
+        for k in range(4)
+    ]
+    tasks = [
+        FlexibleObligation(student_id=STUDENT_ID, name=None, description=f"Task {k}", weekly_target_hours=3, priority=3)
+        for k in range(3)
+    ]
+    db.add_all(lectures + tasks)
+    db.flush()
+    for day in range(weeks * 7):
+        d = start + timedelta(days=day)
+        if d.weekday() < 5:  # ~12 lectures and ~6 sessions a week
+            for k, ob in enumerate(lectures):
+                if (day + k) % 5 < 3:
+                    s = d.replace(hour=9 + 2 * k)
+                    db.add(CalendarEvent(
+                        student_id=STUDENT_ID, event_type="fixed_obligation", fixed_obligation_id=ob.obligation_id,
+                        date=d, start_time=s, end_time=s + timedelta(hours=1), priority=3, status="scheduled",
+                    ))
+            if day % 5 in (0, 2, 3):
+                for k in range(2):
+                    s = d.replace(hour=18 + k)
+                    db.add(CalendarEvent(
+                        student_id=STUDENT_ID, event_type="flexible_obligation",
+                        flexible_obligation_id=tasks[(day + k) % len(tasks)].obligation_id,
+                        date=d, start_time=s, end_time=s + timedelta(hours=1), priority=3, status="scheduled",
+                    ))
+    db.flush()
+
+
+def _per_event_lookup(db, student_id: int, start: datetime, end: datetime) -> list:
+    """The loop this replaces: the window, then one obligation query per event."""
+    out = []
+    events = db.query(CalendarEvent).filter(
+        CalendarEvent.student_id == student_id, CalendarEvent.start_time < end, CalendarEvent.end_time > start,
+    ).order_by(CalendarEvent.start_time).all()
+    for ev in events:
+        name = None
+        if ev.fixed_obligation_id:
+            ob = db.query(FixedObligation).filter(FixedObligation.obligation_id == ev.fixed_obligation_id).first()
+            name = ob.name if ob else None
+        elif ev.flexible_obligation_id:
+            ob = db.query(FlexibleObligation).filter(FlexibleObligation.obligation_id == ev.flexible_obligation_id).first()
+            name = (ob.name or ob.description) if ob else None
+        out.append({**{c.name: getattr(ev, c.name) for c in ev.__table__.columns}, "name": name})
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine, tables=TABLES)
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+    db = SessionLocal()
+    try:
+        start = datetime.combine(date.today(), dtime())
+        _seed(db, args.weeks, start)
+        print(f"  {'window':<9} {'path':<17} {'events':>6} {'statements':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for weeks in (1, args.weeks):
+            end = start + timedelta(weeks=weeks)
+            for label, read in (("per‑event lookup", _per_event_lookup), ("joined", calendar_events_with_names)):
+                times = []
+                for _ in range(args.repeat):
+                    db.expunge_all()  # no identity‑map hits – every read goes to the database
+                    statements[0] = 0
+                    t0 = time.perf_counter()
+                    rows = read(db, STUDENT_ID, start, end)
+                    times.append((time.perf_counter() - t0) * 1000)
+                p95 = statistics.quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
+                print(
+                    f"  {f'{weeks} wk':<9} {label:<17} {len(rows):>6} {statements[0]:>10} "
+                    f"{statistics.median(times):8.2f} {p95:8.2f}"
+                )
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
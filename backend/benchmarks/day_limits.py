@@ -0,0 +1,54 @@
+"""Model size with and without daily caps / a global minimum gap.
+
+Run from ``backend/``::
+
+    python -m benchmarks.day_limits [--weeks 4 8 16 32] [--tasks-per-week 2]
+
+Like ``benchmarks.decomposition`` the load per week is constant, so sessions
+grow linearly with the semester.  ``max_hours_per_day`` / ``min_gap_hours``
+are one linear sum per day and padded slot coverage, so ``vars/sess`` and
+``cons/sess`` should stay flat; ``pairwise`` is what a constraint per pair of
+sessions (the naive gap encoding) would need instead.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.or_tools.optimizer import _solve_with_or_tools
+from benchmarks._synthetic import student_calendar
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--tasks-per-week", type=float, default=2)
+    parser.add_argument("--max-hours-per-day", type=float, default=4)
+    parser.add_argument("--min-gap-hours", type=float, default=1)
+    args = parser.parse_args()
+
+    limited = {"max_day_hours": args.max_hours_per_day, "min_gap_hours": args.min_gap_hours}
+    print(
+        f"  {'weeks':>5} {'sessions':>8} {'limits':<7} {'vars':>7} {'cons':>6} "
+        f"{'vars/sess':>9} {'cons/sess':>9} {'pairwise':>9} {'status':<9} {'solve s':>8}"
+    )
+    for weeks in args.weeks:
+        fixed, tasks = student_calendar(weeks, max(1, round(weeks * args.tasks_per_week)))
+        for label, kwargs in (("off", {}), ("on", limited)):
+            t0 = time.perf_counter()
+            try:
+                _, stats = _solve_with_or_tools(fixed, tasks, **kwargs)
+            except RuntimeError as exc:
+                print(f"  {weeks:>5} {'-':>8} {label:<7} {str(exc)[:50]}")
+                continue
+            elapsed = time.perf_counter() - t0
+            n = stats["session_intervals"]
+            print(
+                f"  {weeks:>5} {n:>8} {label:<7} {stats['model_variables']:>7} {stats['model_constraints']:>6} "
+                f"{stats['model_variables'] / n:9.1f} {stats['model_constraints'] / n:9.2f} "
+                f"{n * (n - 1) // 2:>9} {stats['status']:<9} {elapsed:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
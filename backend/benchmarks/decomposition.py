@@ -0,0 +1,58 @@
+"""Solve time vs. semester length, monolithic model vs. week decomposition.
+
+Run from ``backend/``::
+
+    python -m benchmarks.decomposition [--weeks 4 8 16 32] [--tasks-per-week 2]
+
+The task count grows with the semester (``--tasks-per-week``) so the load per
+week stays constant; a scheduler that scales linearly keeps ``s/week`` flat.
+Both runs use the "balanced" preset – when the monolithic model hits its time
+limit the status column shows it.  ``objective`` is the solved cost (lower is
+better) and ``vs mono`` its ratio to the monolithic run, so a faster weekly
+solve that places sessions much worse shows up next to its wall time.  The
+solve cache is bypassed.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.or_tools.optimizer import _solve_with_or_tools
+from benchmarks._synthetic import student_calendar
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--tasks-per-week", type=float, default=2)
+    parser.add_argument("--night-mode", choices=("soft", "hard"), default="soft")
+    args = parser.parse_args()
+
+    print(
+        f"  {'weeks':>5} {'tasks':>5} {'mode':<11} {'blocks':>6} {'status':<9} {'solve s':>8} {'s/week':>7} "
+        f"{'objective':>10} {'vs mono':>7} {'night':>5}"
+    )
+    for weeks in args.weeks:
+        n_tasks = max(1, round(weeks * args.tasks_per_week))
+        fixed, tasks = student_calendar(weeks, n_tasks)
+        monolithic = None
+        for label, decompose in (("monolithic", False), ("weekly", True)):
+            t0 = time.perf_counter()
+            try:
+                _, stats = _solve_with_or_tools(fixed, tasks, night_mode=args.night_mode, decompose=decompose, cache=None)
+            except RuntimeError as exc:
+                print(f"  {weeks:>5} {n_tasks:>5} {label:<11} {'-':>6} {str(exc)[:40]}")
+                continue
+            elapsed = time.perf_counter() - t0
+            objective = stats["objective"]
+            if monolithic is None and not decompose:
+                monolithic = objective
+            ratio = f"{objective / max(monolithic, 1):7.2f}" if monolithic is not None else f"{'-':>7}"
+            print(
+                f"  {weeks:>5} {n_tasks:>5} {label:<11} {stats['blocks']:>6} {stats['status']:<9} "
+                f"{elapsed:8.2f} {elapsed / weeks:7.3f} {objective:10.0f} {ratio} {stats['night_sessions']:>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
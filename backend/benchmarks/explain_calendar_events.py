@@ -0,0 +1,120 @@
+"""EXPLAIN the hot ``calendar_events`` queries – exits 1 if one scans the table.
+
+Run from ``backend/`` against a database at the current schema
+(``python -m app.migrate upgrade``)::
+
+    DATABASE_URL=postgresql://… python -m benchmarks.explain_calendar_events
+
+The queries are captured from the code that issues them (solver loader,
+free‑time index, recurrence expansion) or built the way the routers build
+them, then EXPLAINed with the same parameters.  On PostgreSQL sequential
+scans are disabled for the check – on small tables the planner picks them
+even with a usable index, so a remaining ``Seq Scan on calendar_events``
+means no index fits.  SQLite (``EXPLAIN QUERY PLAN``) fails on a ``SCAN``
+of the table that is not through an index.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.schedule import CalendarEvent
+from app.or_tools.availability import availability_index
+from app.or_tools.data import load_solver_inputs
+from app.or_tools.recurrence import load_occurrences
+
+STUDENT_ID = 1
+TABLE = CalendarEvent.__tablename__
+_FULL_SCAN = {
+    "postgresql": re.compile(rf"Seq Scan on {TABLE}\b"),
+    "sqlite": re.compile(rf"\bSCAN {TABLE}\w*(?! USING)(?:\s|$)", re.M),
+}
+
+
+def _probes(now: datetime) -> List[Tuple[str, Callable[[Session], object]]]:
+    ce = CalendarEvent
+    window = (now, now + timedelta(days=7))
+    return [
+        ("calendar window (GET /tasks/calendar-events)", lambda db: db.execute(
+            select(ce.__table__)
+            .where(ce.student_id == STUDENT_ID, ce.start_time < window[1], ce.end_time > window[0])
+            .order_by(ce.start_time)
+        ).all()),
+        ("events of one type", lambda db: db.execute(
+            select(ce.event_id).where(ce.student_id == STUDENT_ID, ce.event_type == "fixed_obligation")
+        ).all()),
+        ("events of a fixed obligation", lambda db: db.execute(
+            select(ce.event_id).where(ce.fixed_obligation_id == 1)
+        ).all()),
+        ("events of a flexible obligation", lambda db: db.execute(
+            select(ce.event_id).where(ce.flexible_obligation_id == 1)
+        ).all()),
+        ("events of a study plan", lambda db: db.execute(
+            select(ce.event_id).where(ce.study_session_id == 1)
+        ).all()),
+        ("solver inputs", lambda db: load_solver_inputs(db, [STUDENT_ID], now)),
+        ("fixed occurrences", lambda db: load_occurrences(db, [STUDENT_ID], *window)),
+        ("free-time index build", lambda db: availability_index._build(db, STUDENT_ID, now)),
+    ]
+
+
+@contextmanager
+def _captured(db: Session) -> Iterator[List[Tuple[str, object]]]:
+    """SELECTs touching ``calendar_events`` issued on ``db``'s connection."""
+    seen: List[Tuple[str, object]] = []
+
+    def hook(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and TABLE in statement:
+            seen.append((statement, parameters))
+
+    conn = db.connection()
+    event.listen(conn, "before_cursor_execute", hook)
+    try:
+        yield seen
+    finally:
+        event.remove(conn, "before_cursor_execute", hook)
+
+
+def main() -> int:
+    db = SessionLocal()
+    conn = db.connection()
+    dialect = conn.dialect.name
+    if dialect not in _FULL_SCAN:
+        print(f"unsupported database: {dialect}")
+        return 2
+    if dialect == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        explain = "EXPLAIN "
+    else:
+        explain = "EXPLAIN QUERY PLAN "
+
+    failures = 0
+    try:
+        for label, probe in _probes(datetime.utcnow()):
+            with _captured(db) as statements:
+                probe(db)
+            for statement, parameters in statements:
+                plan = "\n".join(
+                    " | ".join(str(c) for c in row) for row in conn.exec_driver_sql(explain + statement, parameters)
+                )
+                scan = _FULL_SCAN[dialect].search(plan)
+                failures += bool(scan)
+                print(f"{'FAIL' if scan else 'ok  '} {label}")
+                if scan:
+                    print("     " + plan.replace("\n", "\n     "))
+    finally:
+        db.rollback()
+        db.close()
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} scanning {TABLE}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
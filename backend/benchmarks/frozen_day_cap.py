@@ -0,0 +1,56 @@
+"""Daily cap and session gap around a frozen session – exits 1 if ignored.
+
+Run from ``backend/``::
+
+    python -m benchmarks.frozen_day_cap
+
+An incremental re‑solve passes the sessions it does not move as fixed events
+(:func:`_ce_to_dict` flags them ``session``).  With ``max_day_hours=1`` and a
+frozen 1 h session tomorrow, the re‑placed sessions must go to later days;
+with ``min_gap_hours=2`` they must stay two hours clear of it.
+"""
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta
+
+from app.or_tools.data import EventRow
+from app.or_tools.optimizer import _ce_to_dict, _solve_with_or_tools
+
+NOW = datetime(2030, 1, 7, 6)  # a Monday morning
+DAY = NOW.replace(hour=0) + timedelta(days=1)
+
+
+def _task(sessions: int, start: datetime, end: datetime):
+    return {
+        "id": 1, "total_hours": sessions, "session_hours": 1, "min_gap_hours": 0,
+        "start_date": start, "end_date": end, "priority": 3,
+    }
+
+
+def main() -> int:
+    frozen = EventRow(7, "flexible_obligation", 2, DAY.replace(hour=10), DAY.replace(hour=11))
+    fixed = [_ce_to_dict(frozen)]
+    ok = True
+
+    sessions, _ = _solve_with_or_tools(
+        fixed, [_task(2, DAY, DAY + timedelta(days=3))], now=NOW, max_day_hours=1, cache=None,
+    )
+    same_day = sum(s["start"].date() == DAY.date() for s in sessions)
+    ok &= same_day == 0
+    print(f"{'ok  ' if same_day == 0 else 'FAIL'} max_day_hours=1: {same_day} session(s) on the frozen session's day (expected 0)")
+
+    sessions, _ = _solve_with_or_tools(
+        fixed, [_task(1, DAY.replace(hour=9), DAY.replace(hour=23))], now=NOW, min_gap_hours=2, cache=None,
+    )
+    gap = min(
+        s["start"] - frozen.end_time if s["start"] >= frozen.end_time else frozen.start_time - s["end"]
+        for s in sessions
+    )
+    ok &= gap >= timedelta(hours=2)
+    print(f"{'ok  ' if gap >= timedelta(hours=2) else 'FAIL'} min_gap_hours=2: {gap} from the frozen session")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Incremental re‑solve with past sessions – exits 1 if they are mishandled.
+
+Run from ``backend/`` against a scratch PostgreSQL database
+(``fixed_obligations.days_of_week`` is an ARRAY column, which SQLite cannot
+create)::
+
+    DATABASE_URL=postgresql://… python -m benchmarks.incremental_past_sessions
+
+A 4 h obligation has two 1 h sessions in the past and two in the future; its
+edits go through ``update_schedule(changed_obligation_ids=…)``:
+
+* a priority‑only edit must keep four sessions, two of them in the future;
+* lowering the target to the 2 h already done must delete the future two.
+
+:func:`update_schedule` commits, so the seeded student is deleted at the end.
+"""
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app.database import Base, SessionLocal, engine
+import app.models  # noqa: F401 – every table the solver loader reads
+from app.models.schedule import CalendarEvent, FlexibleObligation
+from app.models.student import Student
+from app.or_tools.optimizer import update_schedule
+
+STUDENT_ID = 987_655  # out of the way of real rows
+
+
+def _seed(db, now: datetime) -> int:
+    db.add(Student(student_id=STUDENT_ID, name="check", email="incremental-check@example.com"))
+    ob = FlexibleObligation(
+        student_id=STUDENT_ID, name="check", weekly_target_hours=4, constraints={"session_hours": 1},
+        start_date=now - timedelta(days=3), end_date=now + timedelta(days=5), priority=3,
+    )
+    db.add(ob)
+    db.flush()
+    for day in (-2, -1, 1, 2):
+        s = (now + timedelta(days=day)).replace(hour=14, minute=0, second=0, microsecond=0)
+        db.add(CalendarEvent(
+            student_id=STUDENT_ID, event_type="flexible_obligation", flexible_obligation_id=ob.obligation_id,
+            date=s.replace(hour=0), start_time=s, end_time=s + timedelta(hours=1), priority=3, status="scheduled",
+        ))
+    db.commit()
+    return ob.obligation_id
+
+
+def _check(db, now: datetime, edit: str, expected: tuple) -> bool:
+    oid = _seed(db, now)
+    ob = db.get(FlexibleObligation, oid)
+    if edit == "priority":
+        ob.priority = 5
+    else:
+        ob.weekly_target_hours = 2
+    db.commit()
+    update_schedule(db, student_id=STUDENT_ID, changed_obligation_ids=[oid])
+    starts = db.scalars(select(CalendarEvent.start_time).where(CalendarEvent.flexible_obligation_id == oid)).all()
+    got = (len(starts), sum(s >= now for s in starts))
+    print(f"{'ok  ' if got == expected else 'FAIL'} {edit}: {got[0]} sessions, {got[1]} in the future (expected {expected[0]}, {expected[1]})")
+    return got == expected
+
+
+def _cleanup(db) -> None:
+    db.rollback()
+    db.execute(delete(CalendarEvent).where(CalendarEvent.student_id == STUDENT_ID))
+    db.execute(delete(FlexibleObligation).where(FlexibleObligation.student_id == STUDENT_ID))
+    db.execute(delete(Student).where(Student.student_id == STUDENT_ID))
+    db.commit()
+
+
+def main() -> int:
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    ok = True
+    try:
+        for edit, expected in (("priority", (4, 2)), ("target", (2, 0))):
+            try:
+                ok &= _check(db, datetime.utcnow(), edit, expected)
+            finally:
+                _cleanup(db)
+        return 0 if ok else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
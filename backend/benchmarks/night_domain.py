@@ -0,0 +1,93 @@
+"""Model‑build cost of night blocking: forbidden‑value tables vs. start domains.
+
+Run from ``backend/``::
+
+    python -m benchmarks.night_domain [--weeks 16] [--tasks 30]
+
+*before* rebuilds the old formulation (one ``AddForbiddenAssignments`` table
+listing every night slot per session), *after* the shared
+``Domain.FromIntervals`` day windows used by the optimizer.  Reports build time,
+Python peak memory and serialized model size, then the end‑to‑end solve time.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import time
+import tracemalloc
+from datetime import timedelta
+
+from ortools.sat.python import cp_model
+
+from app.or_tools.optimizer import DAY_START_HOUR, NIGHT_START_HOUR, _solve_with_or_tools
+from benchmarks._synthetic import student_calendar
+
+SLOT_MIN = 30
+
+
+def _sessions(tasks, day0, n_slots):
+    """(low, high) start window for every session, as the optimizer computes it."""
+    for task in tasks:
+        dur = math.ceil(task["session_hours"] * 60 / SLOT_MIN)
+        n_sess = max(1, math.ceil(task["total_hours"] / task["session_hours"]))
+        low = int((task["start_date"] - day0).total_seconds() / 60 / SLOT_MIN)
+        high = min(n_slots - dur, int((task["end_date"] - day0).total_seconds() / 60 / SLOT_MIN) - dur)
+        for _ in range(n_sess):
+            yield low, high
+
+
+def build_before(tasks, day0, n_slots):
+    m = cp_model.CpModel()
+    night = [
+        [s] for s in range(n_slots)
+        if not DAY_START_HOUR <= (day0 + timedelta(minutes=s * SLOT_MIN)).hour < NIGHT_START_HOUR
+    ]
+    for k, (low, high) in enumerate(_sessions(tasks, day0, n_slots)):
+        start = m.NewIntVar(low, high, f"s_{k}")
+        m.AddForbiddenAssignments([start], night)
+    return m
+
+
+def build_after(tasks, day0, n_slots):
+    m = cp_model.CpModel()
+    spd = 24 * 60 // SLOT_MIN
+    lo, hi = math.ceil(DAY_START_HOUR * 60 / SLOT_MIN), math.ceil(NIGHT_START_HOUR * 60 / SLOT_MIN) - 1
+    daytime = cp_model.Domain.FromIntervals([[d * spd + lo, d * spd + hi] for d in range(n_slots // spd + 1)])
+    for k, (low, high) in enumerate(_sessions(tasks, day0, n_slots)):
+        m.NewIntVarFromDomain(daytime.intersection_with(cp_model.Domain(low, high)), f"s_{k}")
+    return m
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model = build(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, model.Proto().ByteSize()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=16)
+    parser.add_argument("--tasks", type=int, default=30)
+    args = parser.parse_args()
+
+    fixed, tasks = student_calendar(args.weeks, args.tasks)
+    day0 = min(t["start_date"] for t in tasks)
+    n_slots = args.weeks * 7 * 24 * 60 // SLOT_MIN
+    n_sessions = sum(1 for _ in _sessions(tasks, day0, n_slots))
+    print(f"{args.weeks} weeks, {args.tasks} tasks, {n_sessions} sessions, {n_slots} slots")
+
+    for label, build in (("before", build_before), ("after", build_after)):
+        elapsed, peak, size = measure(build, tasks, day0, n_slots)
+        print(f"  {label:<7} build {elapsed * 1000:9.1f} ms   py peak {peak / 2**20:7.2f} MiB   model {size / 2**20:7.2f} MiB")
+
+    t0 = time.perf_counter()
+    sessions, _ = _solve_with_or_tools(fixed, tasks)
+    print(f"  solve   {len(sessions)} sessions placed in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
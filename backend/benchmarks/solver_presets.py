@@ -0,0 +1,57 @@
+"""Solve time vs. schedule quality for each entry of ``SOLVER_PRESETS``.
+
+Run from ``backend/``::
+
+    python -m benchmarks.solver_presets [--students 5] [--weeks 4] [--tasks 12]
+
+Every preset solves the same synthetic corpus (one calendar per seed).  Per
+preset the table shows median / max wall time, how many solves were proven
+optimal, and the mean objective gap to the best objective any preset found
+for that calendar – i.e. what the shorter budgets give up.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from app.or_tools.optimizer import SOLVER_PRESETS, _solve_with_or_tools
+from benchmarks._synthetic import student_calendar
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=12)
+    parser.add_argument("--presets", nargs="+", default=list(SOLVER_PRESETS), choices=list(SOLVER_PRESETS))
+    args = parser.parse_args()
+
+    corpus = [student_calendar(args.weeks, args.tasks, seed=seed) for seed in range(args.students)]
+    print(f"{args.students} calendars, {args.weeks} weeks, {args.tasks} tasks each")
+
+    runs = {}  # preset → [(seconds, stats)]
+    for name in args.presets:
+        runs[name] = []
+        for fixed, tasks in corpus:
+            t0 = time.perf_counter()
+            _, stats = _solve_with_or_tools(fixed, tasks, params=name)
+            runs[name].append((time.perf_counter() - t0, stats))
+
+    best = [min(runs[name][i][1]["objective"] for name in args.presets) for i in range(len(corpus))]
+    print(f"  {'preset':<9} {'median s':>9} {'max s':>8} {'optimal':>8} {'gap to best':>12}")
+    for name in args.presets:
+        times = [t for t, _ in runs[name]]
+        optimal = sum(stats["status"] == "OPTIMAL" for _, stats in runs[name])
+        gaps = [
+            (stats["objective"] - b) / max(abs(b), 1)
+            for (_, stats), b in zip(runs[name], best)
+        ]
+        print(
+            f"  {name:<9} {statistics.median(times):9.2f} {max(times):8.2f} "
+            f"{optimal:>4}/{len(corpus):<3} {statistics.mean(gaps):11.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
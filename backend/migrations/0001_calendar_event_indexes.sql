@@ -0,0 +1,32 @@
+-- migrate: no-transaction
+-- 0001 – indexes for the hot calendar_events queries (PostgreSQL)
+--
+-- CONCURRENTLY builds without locking writes, so it cannot run inside a
+-- transaction block – hence no-transaction above.  IF NOT EXISTS makes it
+-- safe to re-run, including where the indexes were created by hand.
+--
+-- A GiST tsrange(start_time, end_time) index is deliberately not added:
+-- every overlap query is per student and written as start_time < :end AND
+-- end_time > :start, which (student_id, start_time) answers; GiST would also
+-- need the btree_gist extension and the queries rewritten to &&.
+
+-- Window reads: GET /tasks/calendar-events, the free-time index, the solver loader
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_student_start
+    ON calendar_events (student_id, start_time);
+
+-- Per-type reads (fixed events of a student, ...)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_student_type
+    ON calendar_events (student_id, event_type);
+
+-- Foreign keys: exception / session lookups, EXISTS probes of the solver
+-- loader, and ON DELETE SET NULL when an obligation, plan or course goes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_fixed_obligation_id
+    ON calendar_events (fixed_obligation_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_flexible_obligation_id
+    ON calendar_events (flexible_obligation_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_study_session_id
+    ON calendar_events (study_session_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_events_course_id
+    ON calendar_events (course_id);
+
+ANALYZE calendar_events;
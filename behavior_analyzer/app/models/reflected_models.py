@@ -1,10 +1,8 @@
 from sqlalchemy.ext.automap import automap_base
-from sqlalchemy import MetaData
-from app.database import engine
+from app.database import engine, load_metadata
 
-# Reflect existing tables from the backend database
-metadata = MetaData()
-metadata.reflect(bind=engine)
+# Reflect existing tables from the backend database (cached per schema version)
+metadata = load_metadata(engine)
 ReflectedBase = automap_base(metadata=metadata)
 ReflectedBase.prepare()
 
@@ -6,7 +6,9 @@ Handles the efficient updating of course data in the database.
 
 import os
 import logging
-from sqlalchemy import Column, create_engine, String, Integer, TIMESTAMP, JSON, text
+import time
+from sqlalchemy import Column, create_engine, inspect, String, Integer, TIMESTAMP, JSON, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone # Import timezone
 from typing import List, Dict, Any
@@ -36,6 +38,29 @@ class Course(Base):
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:1234@db:5432/EECE503N-planner")
+SCHEMA_WAIT_S = float(os.getenv("SCHEMA_WAIT_S", "300"))
+
+
+def wait_for_schema(engine, timeout: float = SCHEMA_WAIT_S) -> None:
+    """
+    Block until the backend has created the courses table.
+
+    The backend owns the schema (backend/migrations) and migrates when it
+    starts, which may be after this service's first sync.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with engine.connect() as conn:
+                if conn.exec_driver_sql("SELECT max(version) FROM schema_version").scalar() is not None \
+                        and inspect(conn).has_table(Course.__tablename__):
+                    return
+        except DBAPIError:  # no schema_version yet
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError("courses table not found – run the backend's migrations (python -m app.migrate upgrade)")
+        logger.info("Waiting for the backend to create the schema...")
+        time.sleep(5)
 
 def transform_course_data(scraped_courses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -159,8 +184,8 @@ def sync_courses(new_courses: List[Dict[str, Any]]) -> Dict[str, int]:
     engine = create_engine(DATABASE_URL)
     
     try:
-        # Create tables if they don't exist
-        Base.metadata.create_all(engine)
+        # The backend owns the schema – wait for its migrations instead of creating tables
+        wait_for_schema(engine)
         
         with Session(engine) as db:
             # Step 1: Create a dictionary of existing courses by code for quick lookups
@@ -1,3 +1,7 @@
+-- Historical draft of the schema, kept for reference only. The schema is
+-- owned by the backend: its models (backend/app/models) and the versioned
+-- migrations in backend/migrations (python -m app.migrate upgrade).
+
 -- -- 1. Students (User and Profile Management)
 -- CREATE TABLE students (
 --     student_id SERIAL PRIMARY KEY,
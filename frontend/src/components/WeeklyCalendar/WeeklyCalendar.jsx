@@ -152,6 +152,7 @@ const WeeklyCalendar = ({ style }) => {
     const eventDate = parseISO(event.date);
     
     return {
+      // A row's number, or "fixed-<obligation>-<YYYYMMDD>" for an occurrence of a recurring fixed obligation
       id: event.event_id,
       type: event.event_type,
       title: event.event_type === 'fixed_obligation' ? 'Fixed: ' + event.name :
@@ -2,27 +2,102 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import MetaData
+from sqlalchemy.exc import DBAPIError
+import hashlib
+import logging
 import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# The backend owns the schema (backend/migrations). This service was written
+# against SCHEMA_VERSION; the tables are reflected once per backend schema
+# version and cached, not on every boot. An older database is waited for; a
+# newer one is logged as a warning (backend migrations stay compatible with the
+# services' pinned versions) and refused when SCHEMA_STRICT=1.
+# Kept in step with behavior_analyzer/app/database.py – each service is built from
+# its own directory and cannot import the other's or the backend's code.
+SCHEMA_VERSION = 1
+SCHEMA_WAIT_S = float(os.getenv("SCHEMA_WAIT_S", "120"))
+SCHEMA_STRICT = os.getenv("SCHEMA_STRICT", "0") == "1"
+SCHEMA_CACHE_DIR = Path(os.getenv("SCHEMA_CACHE_DIR", Path(tempfile.gettempdir()) / "planner-schema"))
+
+
+def wait_for_schema(engine, minimum=SCHEMA_VERSION, timeout=SCHEMA_WAIT_S):
+    """Backend schema version once it is at least ``minimum`` – the backend
+    migrates on startup, which may still be running when this service starts."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with engine.connect() as conn:
+                version = conn.exec_driver_sql("SELECT max(version) FROM schema_version").scalar()
+        except DBAPIError:  # no schema_version yet
+            version = None
+        if version is not None and version >= minimum:
+            return version
+        if time.monotonic() >= deadline:
+            raise RuntimeError(
+                f"database schema is at version {version}, this service needs {minimum} – "
+                "run the backend's migrations (python -m app.migrate upgrade)"
+            )
+        time.sleep(2)
+
+
+def load_metadata(engine, service="mcp_server"):
+    """Reflected MetaData for the database's current schema version, from the
+    cache when this version was reflected before (the cache is written only by
+    this service)."""
+    version = wait_for_schema(engine)
+    if version > SCHEMA_VERSION:
+        message = (
+            f"database schema is at version {version}, newer than the {SCHEMA_VERSION} {service} was "
+            f"written for – bump SCHEMA_VERSION once it has been checked against the new migrations"
+        )
+        if SCHEMA_STRICT:
+            raise RuntimeError(message)
+        logger.warning(message)
+    database = hashlib.sha256(engine.url.render_as_string(hide_password=True).encode()).hexdigest()[:12]
+    path = SCHEMA_CACHE_DIR / f"{service}-{database}-v{version:04d}.pickle"
+    try:
+        with path.open("rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    logger.info(f"Reflecting schema version {version}")
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    try:
+        SCHEMA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(metadata, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not cache reflected schema: {e}")
+    return metadata
+
+
 # Reflect existing tables from the backend database
-metadata = MetaData()
-metadata.reflect(bind=engine)
+metadata = load_metadata(engine)
 ReflectedBase = automap_base(metadata=metadata)
 ReflectedBase.prepare()
 
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
-    try: 
-        yield db 
+    try:
+        yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,6 +1,6 @@
 from mcp.server.fastmcp import FastMCP
 from typing import Dict, List, Optional, Any # Added Any
-from sqlalchemy import func, delete # Added delete
+from sqlalchemy import and_, func, delete, or_, select # Added delete
 from sqlalchemy.orm import Session # Added Session
 import os
 from dotenv import load_dotenv
@@ -106,65 +106,6 @@ def get_start_end_date(semester: str) -> tuple[Optional[date], Optional[date]]:
         logger.error(f"Could not parse semester '{semester}': {e}")
     return None, None
 
-def create_calendar_events_from_fixed(
-    fixed_obligation: FixedObligation,
-    student_id: int, # Changed from Student object
-    db: Session
-):
-    """Creates recurring calendar events based on a FixedObligation."""
-    if not fixed_obligation.start_date or not fixed_obligation.end_date or not fixed_obligation.days_of_week:
-        logger.warning(f"Fixed obligation {fixed_obligation.obligation_id} missing required date/day info for event creation.")
-        return
-
-    current_date = fixed_obligation.start_date
-    end_date = fixed_obligation.end_date
-    days_map = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
-    target_weekdays = {days_map[day] for day in fixed_obligation.days_of_week if day in days_map}
-
-    if not target_weekdays:
-        logger.warning(f"No valid days specified for fixed obligation {fixed_obligation.obligation_id}")
-        return
-
-    events_created = 0
-    while current_date <= end_date:
-        if current_date.weekday() in target_weekdays:
-            start_datetime = datetime.datetime.combine(current_date, fixed_obligation.start_time)
-            end_datetime = datetime.datetime.combine(current_date, fixed_obligation.end_time)
-
-            # Check if event already exists for this exact time to avoid duplicates
-            exists = db.query(CalendarEvent).filter(
-                CalendarEvent.student_id == student_id,
-                CalendarEvent.fixed_obligation_id == fixed_obligation.obligation_id,
-                CalendarEvent.start_time == start_datetime
-            ).first()
-
-            if not exists:
-                new_event = CalendarEvent(
-                    student_id=student_id,
-                    fixed_obligation_id=fixed_obligation.obligation_id,
-                    start_time=start_datetime,
-                    end_time=end_datetime,
-                    event_type="fixed_obligation",
-                    is_recurring=True,
-                    recurrence_pattern=fixed_obligation.recurrence,
-                    location=fixed_obligation.location
-                )
-                db.add(new_event)
-                events_created += 1
-
-        current_date += timedelta(days=1)
-
-    if events_created > 0:
-        try:
-            db.commit()
-            logger.info(f"Created {events_created} calendar events for fixed obligation {fixed_obligation.obligation_id}.")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error committing calendar events for fixed obligation {fixed_obligation.obligation_id}: {e}")
-    else:
-        logger.info(f"No new calendar events needed for fixed obligation {fixed_obligation.obligation_id}.")
-
-
 # --- Existing Tools (add_course, list_courses, get_course, search_courses) ---
 # These seem okay, but ensure they use try/finally for db.close()
 
@@ -284,7 +225,8 @@ def search_courses(query: str, semester: Optional[str] = "Summer 2024-2025") ->
 @mcp_server.tool()
 def register_course(student_id: int, course_id: int) -> Dict:
     """
-    Register a student for a specific course and create corresponding fixed obligations/calendar events.
+    Register a student for a specific course and create corresponding fixed obligations. Their occurrences
+    are expanded from the rule when the calendar is read (_fixed_occurrences), so no events are written.
     Args:
         student_id: The ID of the student.
         course_id: The ID of the course to register for.
@@ -355,13 +297,11 @@ def register_course(student_id: int, course_id: int) -> Dict:
                 location=recurrence.get("location")
             )
             db.add(new_obligation)
-            db.commit() # Commit each obligation to get its ID for event creation
-            db.refresh(new_obligation)
+            db.flush() # Assigns the obligation ID
             created_obligations.append(new_obligation.obligation_id)
             logger.info(f"Created fixed obligation {new_obligation.obligation_id} for student {student_id}, course {course_id}")
 
-            # Create calendar events for this obligation
-            create_calendar_events_from_fixed(new_obligation, student_id, db)
+        db.commit()
 
         # TODO: Add call to schedule optimizer if needed (e.g., call an update_schedule tool)
 
@@ -451,7 +391,8 @@ def unregister_course(student_id: int, course_id: int) -> Dict:
 @mcp_server.tool()
 def create_fixed_obligation(student_id: int, obligation_data: Dict) -> Dict:
     """
-    Create a new fixed obligation (non-course related) for a student and associated calendar events.
+    Create a new fixed obligation (non-course related) for a student. Only the rule is stored; its
+    occurrences are expanded when the calendar is read.
     Args:
         student_id: The ID of the student.
         obligation_data: A dictionary containing obligation details (name, start_time, end_time, days_of_week, etc., matching FixedObligationInput).
@@ -475,9 +416,6 @@ def create_fixed_obligation(student_id: int, obligation_data: Dict) -> Dict:
         db.refresh(new_obligation)
         logger.info(f"Created fixed obligation {new_obligation.obligation_id} for student {student_id}")
 
-        # Create calendar events
-        create_calendar_events_from_fixed(new_obligation, student_id, db)
-
         # TODO: Add call to schedule optimizer if needed
 
         obligation_dict = {c.name: getattr(new_obligation, c.name) for c in new_obligation.__table__.columns}
@@ -511,7 +449,8 @@ def get_fixed_obligations(student_id: int) -> List[Dict]:
 @mcp_server.tool()
 def update_fixed_obligation(student_id: int, obligation_id: int, update_data: Dict) -> Dict:
     """
-    Update an existing fixed obligation for a student. Note: This might require deleting and recreating calendar events.
+    Update an existing fixed obligation for a student. If its schedule changes, the future exceptions
+    (moved / cancelled occurrences) stored for the old rule are dropped.
     Args:
         student_id: The ID of the student.
         obligation_id: The ID of the obligation to update.
@@ -544,18 +483,15 @@ def update_fixed_obligation(student_id: int, obligation_id: int, update_data: Di
                  logger.warning(f"Ignoring invalid field in update_data: {key}")
 
 
-        # **Important**: If time, date, or days_of_week changed, delete old events and recreate
-        # This logic can be complex, simplified here
-        # if any(k in update_data for k in ['start_time', 'end_time', 'days_of_week', 'start_date', 'end_date']):
-        #     logger.info(f"Recurrence changed for obligation {obligation_id}, recreating calendar events.")
-        #     db.execute(delete(CalendarEvent).where(CalendarEvent.fixed_obligation_id == obligation_id))
-        #     # Commit deletion before creating new ones if necessary
-        #     db.commit()
-        #     create_calendar_events_from_fixed(obligation, student_id, db) # Pass the updated obligation
-        # else:
-        #     db.commit() # Commit simple updates
+        # Occurrences are expanded from the rule on read, so nothing needs recreating - but the
+        # exceptions stored for the old schedule no longer apply to the future ones
+        if any(k in update_data for k in ['start_time', 'end_time', 'days_of_week', 'start_date', 'end_date', 'recurrence']):
+            db.execute(delete(CalendarEvent).where(
+                CalendarEvent.fixed_obligation_id == obligation_id,
+                CalendarEvent.date >= datetime.datetime.combine(date.today(), datetime.time()),
+            ))
 
-        db.commit() # Commit updates (event recreation needs more robust handling)
+        db.commit()
         db.refresh(obligation)
         logger.info(f"Updated fixed obligation {obligation_id} for student {student_id}")
 
@@ -827,6 +763,123 @@ def get_academic_tasks(student_id: int, course_id: Optional[int] = None) -> List
         db.close()
 
 
+_WEEKDAYS = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
+_RECURRENCE_STEP_DAYS = {"weekly": 7, "biweekly": 14, "monthly": 30}
+
+
+def _fixed_occurrences(db: Session, student_id: int, start_date: datetime.datetime, end_date: datetime.datetime) -> List[Dict]:
+    """
+    Occurrences of the student's recurring fixed obligations overlapping the window. The backend stores
+    only the rule; a calendar_events row with the obligation id and the occurrence's date (moved or
+    status 'cancelled') replaces that occurrence.
+    """
+    events = CalendarEvent.__table__
+    rules = FixedObligation.__table__
+    stmt = (
+        select(rules, events.c.date.label("exception_date"))
+        .outerjoin(events, and_(
+            events.c.fixed_obligation_id == rules.c.obligation_id,
+            events.c.date >= start_date.replace(hour=0, minute=0, second=0, microsecond=0),
+            events.c.date < end_date,
+        ))
+        .where(
+            rules.c.student_id == student_id,
+            rules.c.start_date <= end_date.date(),
+            or_(rules.c.end_date.is_(None), rules.c.end_date >= start_date.date()),
+        )
+    )
+    found, skip = {}, {}
+    for row in db.execute(stmt):
+        found.setdefault(row.obligation_id, row)
+        skip.setdefault(row.obligation_id, set())
+        if row.exception_date is not None:
+            skip[row.obligation_id].add(row.exception_date.date() if isinstance(row.exception_date, datetime.datetime) else row.exception_date)
+
+    occurrences = []
+    for obligation_id, rule in found.items():
+        step = timedelta(days=_RECURRENCE_STEP_DAYS.get(rule.recurrence, 7))
+        last = min(end_date.date(), rule.end_date) if rule.end_date else end_date.date()
+        for day_name in rule.days_of_week or []:
+            if day_name not in _WEEKDAYS:
+                continue
+            day = rule.start_date + timedelta(days=(_WEEKDAYS[day_name] - rule.start_date.weekday()) % 7)
+            if day < start_date.date():
+                day += step * -(-(start_date.date() - day).days // step.days)
+            while day <= last:
+                occurrence_start = datetime.datetime.combine(day, rule.start_time)
+                occurrence_end = datetime.datetime.combine(day, rule.end_time)
+                if day not in skip[obligation_id] and occurrence_start < end_date and occurrence_end > start_date:
+                    occurrences.append({
+                        **dict.fromkeys(c.name for c in events.columns),
+                        # No row: a stable id in the backend's format (recurrence.occurrence_id)
+                        "event_id": f"fixed-{obligation_id}-{day:%Y%m%d}",
+                        "student_id": student_id,
+                        "event_type": "fixed_obligation",
+                        "fixed_obligation_id": obligation_id,
+                        "course_id": rule.course_id,
+                        "date": datetime.datetime.combine(day, datetime.time()),
+                        "start_time": occurrence_start,
+                        "end_time": occurrence_end,
+                        "priority": rule.priority,
+                        "status": "scheduled",
+                        "name": rule.name,
+                        "obligation_type": "fixed",
+                        "obligation_id": obligation_id,
+                    })
+                day += step
+    return occurrences
+
+
+def _calendar_events_with_details(db: Session, student_id: int, start_date: datetime.datetime, end_date: datetime.datetime) -> List[Dict]:
+    """Events overlapping the window with their obligation's name, type and id - one query with outer joins,
+    plus the occurrences of recurring fixed obligations."""
+    events = CalendarEvent.__table__
+    stmt = (
+        select(
+            events,
+            FixedObligation.name.label("fixed_name"),
+            FlexibleObligation.obligation_id.label("flexible_found"),
+            FlexibleObligation.name.label("flexible_name"),
+            FlexibleObligation.description.label("flexible_description"),
+        )
+        .outerjoin(FixedObligation, FixedObligation.obligation_id == events.c.fixed_obligation_id)
+        .outerjoin(FlexibleObligation, FlexibleObligation.obligation_id == events.c.flexible_obligation_id)
+        .where(
+            events.c.student_id == student_id,
+            events.c.start_time < end_date,
+            events.c.end_time > start_date,
+        )
+        .order_by(events.c.start_time)
+    )
+    columns = [c.name for c in events.columns]
+    events_with_details = []
+    for row in db.execute(stmt):
+        event_dict = dict(zip(columns, row))
+        if event_dict["fixed_obligation_id"] and event_dict.get("status") == "cancelled":
+            continue # A cancelled occurrence only hides the rule's one
+        obligation_name = "Unknown Event"
+        obligation_type = "unknown"
+        obligation_id = None
+        if event_dict["fixed_obligation_id"]:
+            if row.fixed_name is not None:
+                obligation_name = row.fixed_name
+            obligation_type = "fixed"
+            obligation_id = event_dict["fixed_obligation_id"]
+        elif event_dict["flexible_obligation_id"]:
+            if row.flexible_found is not None:
+                obligation_name = row.flexible_name or row.flexible_description # Fallback to description
+            obligation_type = "flexible"
+            obligation_id = event_dict["flexible_obligation_id"]
+        event_dict["name"] = obligation_name
+        event_dict["obligation_type"] = obligation_type
+        event_dict["obligation_id"] = obligation_id # Add the linked obligation ID
+        events_with_details.append(event_dict)
+    occurrences = _fixed_occurrences(db, student_id, start_date, end_date)
+    if occurrences:
+        events_with_details = sorted(events_with_details + occurrences, key=lambda e: e["start_time"])
+    return events_with_details
+
+
 @mcp_server.tool()
 def get_calendar_events(student_id: int, start_date_str: Optional[str] = None, end_date_str: Optional[str] = None) -> List[Dict]:
     """
@@ -849,38 +902,7 @@ def get_calendar_events(student_id: int, start_date_str: Optional[str] = None, e
         if start_date >= end_date:
              raise ValueError("Start date must be before end date")
 
-        events = db.query(CalendarEvent).filter(
-            CalendarEvent.student_id == student_id,
-            CalendarEvent.start_time < end_date,
-            CalendarEvent.end_time > start_date
-        ).order_by(CalendarEvent.start_time).all()
-
-        events_with_details = []
-        for event in events:
-            obligation_name = "Unknown Event"
-            obligation_type = "unknown"
-            obligation_id = None
-
-            if event.fixed_obligation_id:
-                obligation = db.query(FixedObligation.name).filter(FixedObligation.obligation_id == event.fixed_obligation_id).first()
-                if obligation:
-                    obligation_name = obligation.name
-                obligation_type = "fixed"
-                obligation_id = event.fixed_obligation_id
-            elif event.flexible_obligation_id:
-                obligation = db.query(FlexibleObligation.name, FlexibleObligation.description).filter(FlexibleObligation.obligation_id == event.flexible_obligation_id).first()
-                if obligation:
-                    obligation_name = obligation.name or obligation.description # Fallback to description
-                obligation_type = "flexible"
-                obligation_id = event.flexible_obligation_id
-
-            event_dict = {c.name: getattr(event, c.name) for c in event.__table__.columns}
-            event_dict["name"] = obligation_name
-            event_dict["obligation_type"] = obligation_type
-            event_dict["obligation_id"] = obligation_id # Add the linked obligation ID
-            events_with_details.append(event_dict)
-
-        return events_with_details
+        return _calendar_events_with_details(db, student_id, start_date, end_date)
     finally:
         db.close()
 